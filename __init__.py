@@ -13,9 +13,13 @@ GLTF_EXTENSION_NAME = "SRC_scene_data"
 
 import bpy
 import bpy.types
+import typing
 from . import auto_load
-from .data.scene import CollectionData, ObjectData
-import io_scene_gltf2.io.com.gltf2_io as gltf2
+
+if typing.TYPE_CHECKING:
+    # The glTF modules and the export stack are only imported once an export starts
+    import io_scene_gltf2.io.com.gltf2_io as gltf2
+    from .export.session import ExportSession
 
 auto_load.init()
 
@@ -32,28 +36,25 @@ class glTF2ExportUserExtension:
         # We need to wait until we create the gltf2UserExtension to import the gltf2 modules
         # Otherwise, it may fail because the gltf2 may not be loaded yet
         from io_scene_gltf2.io.com.gltf2_io_extensions import Extension
+        from .export.session import ExportSession
         self.Extension = Extension
+        self.ExportSession = ExportSession
+        self.session = None
+        self.export_settings = None
+
+    def get_session(self, export_settings) -> 'ExportSession | None':
+        # The exporter creates a new extension instance for every export,
+        # but don't rely on it. Exports of anything but a Sourcery collection have no session
+        if self.export_settings is not export_settings:
+            self.session = self.ExportSession.begin(export_settings)
+            self.export_settings = export_settings
+        return self.session
 
     def gather_gltf_extensions_hook(self, gltf2_plan, export_settings):
-
-        collection_id = export_settings['gltf_collection']
-        if not collection_id:
-            return # Not a collection export
-
-        collection = bpy.data.collections.get((collection_id, None))
-        if not collection:
-            return print(f"[Sourcery] Error: Failed to find collection '{collection_id}'")
-        
-        # Get Sourcery data
-        if not hasattr(collection, 'sourcery_data'):
-            return print(f"[Sourcery] Error: Collection '{collection_id}' has no Sourcery data")
-        data = collection.sourcery_data
-        if not data:
-            return print(f"[Sourcery] Error: Collection '{collection_id}' has no Sourcery data")
-
-        # Save to glTF
-        extension = {}
-        CollectionData.save_to_gltf(data, extension)
+        session = self.get_session(export_settings)
+        if session is None:
+            return
+        extension = session.scene_extension(gltf2_plan)
 
         if gltf2_plan.extensions is None:
             gltf2_plan.extensions = {}
@@ -64,26 +65,32 @@ class glTF2ExportUserExtension:
         )
 
     def gather_node_hook(self, gltf2_node, blender_object, export_settings):
+        session = self.get_session(export_settings)
+        if session is not None:
+            session.gather_node(gltf2_node, blender_object)
+            return
         if not hasattr(blender_object, 'sourcery_data'):
             return
-    
-        data = blender_object.sourcery_data
-        extension = {}
-        ObjectData.save_to_gltf(data, extension)
 
+        # Plain glTF exports only get each object's own tags
+        from .data.scene import ObjectData
+        extension = {}
+        ObjectData.save_to_gltf(blender_object.sourcery_data, extension)
         if extension:
+            if gltf2_node.extensions is None:
+                gltf2_node.extensions = {}
             gltf2_node.extensions[GLTF_EXTENSION_NAME] = self.Extension(
                 name=GLTF_EXTENSION_NAME,
                 extension=extension,
                 required=False
             )
 
-    def gather_mesh_hook(self, gltf2_mesh: gltf2.Mesh, blender_mesh: bpy.types.Mesh, blender_object, vertex_groups, modifiers, materials, export_settings):
+    def gather_mesh_hook(self, gltf2_mesh: 'gltf2.Mesh', blender_mesh: bpy.types.Mesh, blender_object, vertex_groups, modifiers, materials, export_settings):
         # Get number of color attributes
         num_color_attrs = len(blender_mesh.color_attributes)
 
         # For each primitive
-        prim: gltf2.MeshPrimitive
+        prim: 'gltf2.MeshPrimitive'
         for prim in gltf2_mesh.primitives:
             # Check if we have a fake COLOR_0 (glTF exporter loves to add this)
             has_fake_color0 = num_color_attrs < sum(1 for attr in prim.attributes if attr.startswith('COLOR_'))
@@ -96,3 +103,7 @@ class glTF2ExportUserExtension:
                 attr = f'COLOR_{i+1}' if has_fake_color0 else f'COLOR_{i}'
                 if attr in prim.attributes:
                     prim.attributes[attr].name = colors.name
+
+        session = self.get_session(export_settings)
+        if session is not None:
+            session.gather_mesh(gltf2_mesh)
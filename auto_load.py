@@ -1,11 +1,15 @@
 import os
 import bpy
 import sys
+import json
+import time
 import typing
+import hashlib
 import inspect
 import pkgutil
 import importlib
 from pathlib import Path
+from .util.profiling import get_rss, format_bytes
 
 __all__ = (
     "init",
@@ -17,15 +21,38 @@ blender_version = bpy.app.version
 
 modules = None
 ordered_classes = None
+timings = {}
 
 def init():
     global modules
     global ordered_classes
 
-    modules = get_all_submodules(Path(__file__).parent)
+    start = time.perf_counter()
+    timings["rss"] = get_rss()
+    directory = Path(__file__).parent
+    key = get_manifest_key(directory)
+    manifest = load_manifest(key)
+
+    if manifest is not None:
+        try:
+            modules = [importlib.import_module("." + name, __package__) for name in manifest["modules"]]
+            timings["import"] = time.perf_counter() - start
+            ordered_classes = get_classes_from_manifest(manifest["classes"])
+            timings["classes"] = time.perf_counter() - start - timings["import"]
+            timings["source"] = "manifest"
+            return
+        except (ImportError, AttributeError, KeyError):
+            pass
+
+    modules = get_all_submodules(directory)
+    timings["import"] = time.perf_counter() - start
     ordered_classes = get_ordered_classes_to_register(modules)
+    timings["classes"] = time.perf_counter() - start - timings["import"]
+    timings["source"] = "scan"
+    save_manifest(key, modules, ordered_classes)
 
 def register():
+    start = time.perf_counter()
     for cls in ordered_classes:
         bpy.utils.register_class(cls)
 
@@ -35,6 +62,20 @@ def register():
         if hasattr(module, "register"):
             module.register()
 
+    timings["register"] = time.perf_counter() - start
+    if timings.get("rss") is not None:
+        timings["memory"] = get_rss() - timings["rss"]
+    if bpy.app.debug or os.environ.get("SOURCERY_PROFILE_STARTUP") == "1":
+        print_timings()
+
+def print_timings():
+    # Printed on startup with --debug or SOURCERY_PROFILE_STARTUP=1, or call from the Python console
+    gltf_modules = sum(1 for name in sys.modules if name.startswith("io_scene_gltf2"))
+    print("[Sourcery] Startup: {} classes from {}, import {:.1f}ms, classes {:.1f}ms, register {:.1f}ms, memory +{}, {} glTF modules loaded".format(
+        len(ordered_classes), timings.get("source"),
+        timings.get("import", 0) * 1000, timings.get("classes", 0) * 1000, timings.get("register", 0) * 1000,
+        format_bytes(timings.get("memory")), gltf_modules))
+
 def unregister():
     for module in modules:
         if module.__name__ == __name__:
@@ -72,6 +113,69 @@ def iter_submodule_names(path, root=""):
             yield root + module_name
 
 
+# Registration manifest
+#################################################
+
+MANIFEST_VERSION = 2
+
+def get_manifest_path():
+    try:
+        directory = Path(bpy.utils.extension_path_user(__package__, create=True))
+    except (ValueError, AttributeError):
+        directory = Path(__file__).parent / "__pycache__"    # Legacy add-on
+    return directory / "registration.json"
+
+def get_manifest_key(directory):
+    # Any change to the add-on's files or the Blender version invalidates the manifest
+    h = hashlib.sha1(f"{MANIFEST_VERSION}:{blender_version}".encode())
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith((".", "__")))
+        for name in sorted(files):
+            if name.endswith((".py", ".toml")):
+                stat = os.stat(os.path.join(root, name))
+                h.update(f"{os.path.relpath(os.path.join(root, name), directory)}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+    return h.hexdigest()
+
+def load_manifest(key):
+    try:
+        with open(get_manifest_path(), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("key") == key else None
+
+def save_manifest(key, modules, ordered_classes):
+    package_prefix = __package__ + "."
+    manifest = {
+        "key": key,
+        "modules": [module.__name__[len(package_prefix):] for module in modules if needs_import(module, ordered_classes)],
+        "classes": [[cls.__module__[len(package_prefix):], cls.__qualname__] for cls in ordered_classes],
+    }
+    try:
+        path = get_manifest_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+    except OSError:
+        pass
+
+def needs_import(module, ordered_classes):
+    # Modules without classes or register functions are imported when something uses them
+    if any(hasattr(module, name) for name in ("register", "unregister", "pre_unregister")):
+        return True
+    return any(cls.__module__ == module.__name__ for cls in ordered_classes)
+
+def get_classes_from_manifest(entries):
+    classes = []
+    for module_name, qualname in entries:
+        value = sys.modules[__package__ + "." + module_name]
+        for part in qualname.split("."):
+            value = getattr(value, part)
+        if not getattr(value, "is_registered", False):
+            classes.append(value)
+    return classes
+
+
 # Find classes to register
 #################################################
 
@@ -149,15 +253,27 @@ def get_register_base_types():
 #################################################
 
 def toposort(deps_dict):
+    # Kahn's algorithm, emitting classes in the same rounds as before
+    dependents = {value : [] for value in deps_dict}
+    remaining = {}
+    for value, deps in deps_dict.items():
+        remaining[value] = len(deps)
+        for dep in deps:
+            dependents[dep].append(value)
+
     sorted_list = []
-    sorted_values = set()
-    while len(deps_dict) > 0:
-        unsorted = []
-        for value, deps in deps_dict.items():
-            if len(deps) == 0:
-                sorted_list.append(value)
-                sorted_values.add(value)
-            else:
-                unsorted.append(value)
-        deps_dict = {value : deps_dict[value] - sorted_values for value in unsorted}
+    ready = [value for value, count in remaining.items() if count == 0]
+    while ready:
+        sorted_list.extend(ready)
+        next_ready = []
+        for value in ready:
+            for dependent in dependents[value]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    next_ready.append(dependent)
+        ready = next_ready
+
+    if len(sorted_list) < len(deps_dict):
+        cycle = sorted(f"{value.__module__}.{value.__qualname__}" for value, count in remaining.items() if count > 0)
+        raise RuntimeError("Classes with circular register dependencies: " + ", ".join(cycle))
     return sorted_list
@@ -2,7 +2,10 @@ import bpy
 from .. import ui
 from bpy.types import AddonPreferences, Operator, PropertyGroup, UIList
 from bpy.props import StringProperty, CollectionProperty, IntProperty, PointerProperty, EnumProperty
-from .surfaceprops import SurfaceProp, SURFACEPROPS
+from .surfaceprops import SurfaceProp, SURFACEPROPS, sync_surfaceprops
+from ..game.filesystem import GameFileSystem, get_filesystem, close_filesystems
+from ..game.keyvalues import KeyValuesError
+from ..game.surfaceprops import loader as surfaceprop_loader
 
 class GameInfo(PropertyGroup):
     name: StringProperty(
@@ -14,14 +17,19 @@ class GameInfo(PropertyGroup):
         name='Game Folder', 
         subtype='DIR_PATH',
         description='Path to folder containing gameinfo.txt',
-        default=''
+        default='',
+        update=lambda self, context: on_game_changed()
     )
 
+    def get_filesystem(self) -> 'GameFileSystem':
+        '''Index of the game's content'''
+        return get_filesystem(bpy.path.abspath(self.gamedir))
+
 ###############################################################################
 
 class SourcePrefs:
     games: CollectionProperty(type=GameInfo)
-    games_active: IntProperty(default=-1)
+    games_active: IntProperty(default=-1, update=lambda self, context: on_game_changed())
     surfaceprops: CollectionProperty(type=SurfaceProp)
     tab_active: EnumProperty(
         name='Tab',
@@ -58,6 +66,18 @@ class SourcePreferences(SourcePrefs, AddonPreferences):
     def data_path(self):
         return f'preferences.addons["{package_name}"].preferences'
     
+    def get_surfaceprops(self):
+        '''Surfaceprops of the active game, read from its scripts on first use'''
+        if not surfaceprops_loaded:
+            load_surfaceprops()
+        return self.surfaceprops
+
+    def get_game(self) -> GameInfo | None:
+        '''The active game, if it has a game folder set'''
+        if 0 <= self.games_active < len(self.games) and self.games[self.games_active].gamedir:
+            return self.games[self.games_active]
+        return None
+
     def save(self, data):
         for key, value in self.items():
             data[key] = value
@@ -73,14 +93,14 @@ class SourcePreferences(SourcePrefs, AddonPreferences):
         header = layout.row()
         header.alignment = 'CENTER'
         header.label(text="Games")
-        #game = ui.draw_list(layout, 'SRC_UL_game_list', prefs, 'games', prefs, 'games_active', rows=(4 if len(self.games) > 1 else 3))
+        game = ui.draw_list(layout, 'SRC_UL_game_list', prefs, 'games', prefs, 'games_active', rows=(4 if len(self.games) > 1 else 3))
         
-        #if game is not None:
-        #    col = layout.column()
-        #    col.use_property_split = True
-        #    col.use_property_decorate = False
-        #    col.prop(game, 'name')
-        #    col.prop(game, 'gamedir')
+        if game is not None:
+            col = layout.column()
+            col.use_property_split = True
+            col.use_property_decorate = False
+            col.prop(game, 'name')
+            col.prop(game, 'gamedir')
 
 ###############################################################################
 
@@ -93,12 +113,36 @@ def register():
     if hasattr(bpy.context.window_manager, 'sourcery_prefs'):
         prefs.load(bpy.context.window_manager.sourcery_prefs)
 
-    if len(prefs.surfaceprops) != len(SURFACEPROPS):
-        prefs.surfaceprops.clear()
-        for prop in SURFACEPROPS:
-            prefs.surfaceprops.add().name = prop
-        
-        
+# Surfaceprops are read from the game's index the first time they're needed,
+# so startup doesn't have to load or build it
+surfaceprops_loaded = False
+
+def on_game_changed():
+    '''Close the VPKs of games that are no longer active and reload surfaceprops when next used'''
+    global surfaceprops_loaded
+    game = SourcePreferences.get().get_game()
+    close_filesystems(keep=[bpy.path.abspath(game.gamedir)] if game is not None else [])
+    surfaceprops_loaded = False
+
+def load_surfaceprops():
+    '''Fill the surfaceprop list from the active game, or the built-in list if there is none'''
+    global surfaceprops_loaded
+    surfaceprops_loaded = True
+    prefs = SourcePreferences.get()
+    densities = {name: 0.0 for name in SURFACEPROPS}
+    game = prefs.get_game()
+    if game is not None:
+        try:
+            props = surfaceprop_loader.load(game.get_filesystem())
+            if props:
+                densities = {name: p['density'] for name, p in props.items()}
+        except (OSError, KeyValuesError) as e:
+            print(f"[Sourcery] Warning: Failed to load surfaceprops for {game.name}: {e}")
+    sync_surfaceprops(prefs.surfaceprops, densities)
+
+def unregister():
+    close_filesystems()
+
 
 def pre_unregister():
     # Save prefs to the WindowManager so they aren't cleared when we reload the addon
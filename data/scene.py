@@ -1,7 +1,9 @@
 import bpy
 from bpy.types import PropertyGroup, UIList, Collection, UILayout, Context
-from bpy.props import StringProperty, IntProperty, BoolProperty, FloatProperty, EnumProperty, CollectionProperty
+from bpy.props import StringProperty, IntProperty, BoolProperty, FloatProperty, EnumProperty, CollectionProperty, PointerProperty
 from .surfaceprops import SurfaceProp
+from .prefs import SourcePreferences
+from ..game.surfaceprops import DEFAULT_DENSITY
 from ..ui import lists
 
 SCALES = {
@@ -12,6 +14,9 @@ SCALES = {
     'SCALE_1': 1.0,
 }
 
+# Size of a Hammer Unit in the engine's physics, in meters
+METERS_PER_HAMMER_UNIT = 0.0254
+
 CollisionModeProperty = EnumProperty(
     name='Collision',
     items=(
@@ -25,6 +30,16 @@ CollisionModeProperty = EnumProperty(
     default='AUTO'
 )
 
+# Integer face attribute holding a collision mode for each face, by enum number
+FACE_COLLISION_ATTRIBUTE = 'sourcery_collision'
+FACE_COLLISION_MODES = {number: id.lower() for id, _, _, _, number in CollisionModeProperty.keywords['items']}
+
+# Version of the SRC_scene_data layout for each tag format
+TAG_FORMAT_VERSIONS = {
+    'NODES': 1,
+    'TABLE': 3,     # 3: other node tags under "tags"
+}
+
 class MaterialPath(PropertyGroup):
     path: StringProperty(
         name='Path',
@@ -37,10 +52,34 @@ class MaterialPathList(UIList):
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname):
         layout.prop(item, 'path', text='', icon='FILE_FOLDER', emboss=False, translate=False)
 
+class LODLevel(PropertyGroup):
+    ratio: FloatProperty(
+        name='Ratio',
+        description='Fraction of the triangles to keep',
+        subtype='FACTOR', min=0.01, max=1.0, default=0.5
+    )
+    switch_point: FloatProperty(
+        name='Switch Point',
+        description='Screen size metric at which the model compiler switches to this LOD',
+        min=0.0, default=10.0
+    )
+
+class LODLevelList(UIList):
+    bl_idname = 'SRC_UL_lods'
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname):
+        row = layout.row(align=True)
+        row.prop(item, 'ratio', emboss=False)
+        row.prop(item, 'switch_point', emboss=False)
+
 class CollectionData(PropertyGroup):
-    #collision: PointerProperty(name='Collision', type=Collection)
+    collision: PointerProperty(
+        name='Collision',
+        description='Collection to use as the collision model instead of the model\'s own objects. Can be shared by many models',
+        type=Collection,
+        poll=lambda self, collection: collection != self.id_data
+    )
     #surfaceprops: CollectionProperty(type=SurfaceProp)
-    #surfaceprop: StringProperty(name='Surface Property', default='default')
+    surfaceprop: StringProperty(name='Surface Property', description='Physical material of the model', default='default')
     scale_mode: EnumProperty(
         name='Scale',
         items=(
@@ -58,6 +97,120 @@ class CollectionData(PropertyGroup):
     collision_mode: CollisionModeProperty
     cdmaterials: CollectionProperty(type=MaterialPath)
     cdmaterials_active: IntProperty(default=-1)
+    tag_format: EnumProperty(
+        name='Tag Format',
+        items=(
+            ('NODES',   "Per Node",     'Store object tags in an extension on each node.'),
+            ('TABLE',   "Scene Table",  'Store object tags in a single table of node indices. Smaller and faster to parse with many tagged objects.'),
+        ),
+        description='How object tags are stored in the glTF file.',
+        default='NODES'
+    )
+    generate_hulls: BoolProperty(
+        name='Generate Hulls',
+        description='Compute convex hulls for objects with hull collision instead of leaving it to the model compiler',
+        default=False
+    )
+    fit_boxes: EnumProperty(
+        name='Fit Boxes',
+        items=(
+            ('NONE',    "None",     'Leave fitting box colliders to the model compiler.'),
+            ('EXTENTS', "Extents",  'Fit an oriented box to objects with box collision and store its center, axes and half extents in object space.'),
+            ('MESH',    "Mesh",     'Fit an oriented box to objects with box collision and export it as an 8 vertex collision mesh.'),
+        ),
+        description='Compute tight oriented boxes for objects with box collision.',
+        default='NONE'
+    )
+    decompose: BoolProperty(
+        name='Decompose Meshes',
+        description='Split objects with mesh collision into convex pieces instead of exporting them as one concave collider',
+        default=False
+    )
+    decompose_pieces: IntProperty(
+        name='Max Pieces',
+        description='Maximum number of convex pieces per object',
+        min=1, max=256, default=16
+    )
+    decompose_vertices: IntProperty(
+        name='Max Piece Vertices',
+        description='Maximum number of vertices in each convex piece',
+        min=4, max=1024, default=32
+    )
+    decompose_resolution: IntProperty(
+        name='Resolution',
+        description='Number of voxels along the longest side of an object. Higher is more accurate but slower',
+        min=8, max=128, default=32
+    )
+    compute_bounds: BoolProperty(
+        name='Compute Bounds',
+        description='Store the render box, collision box and bounding sphere of the model in Hammer Units. Evaluates every mesh of the model a second time',
+        default=False
+    )
+    compute_mass: BoolProperty(
+        name='Compute Mass',
+        description='Compute the mass, center of mass and inertia of the collision model from the density of its surface property',
+        default=False
+    )
+    resolve_auto: BoolProperty(
+        name='Resolve Auto',
+        description='Choose a collision mode for the model and any objects set to Auto when exporting, based on their size and shape',
+        default=False
+    )
+    auto_box_fill: FloatProperty(
+        name='Box Fill',
+        description='Use box collision for objects that fill at least this much of their bounding box',
+        subtype='FACTOR', min=0.0, max=1.0, default=0.95
+    )
+    auto_hull_size: FloatProperty(
+        name='Hull Size',
+        description='Use hull collision for objects whose largest dimension is at most this many Hammer Units',
+        min=0.0, default=64.0
+    )
+    auto_mesh_triangles: IntProperty(
+        name='Max Mesh Triangles',
+        description='Use hull collision instead of mesh collision for objects with more triangles than this',
+        min=0, default=5000
+    )
+
+    split_meshes: BoolProperty(
+        name='Split Meshes',
+        description='Weld duplicate vertices and split meshes that are over the vertex or triangle limit into several meshes when exporting',
+        default=True
+    )
+    limit_vertices: IntProperty(
+        name='Max Vertices',
+        description='Most vertices the model compiler accepts in a single mesh',
+        min=3, default=65535
+    )
+    limit_triangles: IntProperty(
+        name='Max Triangles',
+        description='Most triangles the model compiler accepts in a single mesh',
+        min=1, default=65535
+    )
+    limit_convex_pieces: IntProperty(
+        name='Max Convex Pieces',
+        description='Most convex pieces the model compiler accepts in the collision model',
+        min=1, default=40
+    )
+
+    generate_lods: BoolProperty(
+        name='Generate LODs',
+        description='Decimate each visible object for every LOD level when exporting. Results are cached',
+        default=False
+    )
+    lods: CollectionProperty(type=LODLevel)
+    lods_active: IntProperty(default=-1)
+
+    optimize_meshes: BoolProperty(
+        name='Optimize Meshes',
+        description='Reorder triangles and vertices for the GPU vertex cache and less overdraw when exporting. Slow on very large meshes',
+        default=False
+    )
+    vertex_cache_size: IntProperty(
+        name='Vertex Cache Size',
+        description='Number of vertices the optimized order assumes the GPU keeps transformed',
+        min=3, max=64, default=16
+    )
 
     @staticmethod
     def save_to_gltf(self, data):
@@ -70,9 +223,27 @@ class CollectionData(PropertyGroup):
             case 'AUTO': pass
             case mode: data['$collision'] = mode.lower()
 
+        if self.surfaceprop:
+            data['$surfaceprop'] = self.surfaceprop
+
         if len(self.cdmaterials) > 0:
             data['$cdmaterials'] = [m.path for m in self.cdmaterials]
 
+        data['$version'] = TAG_FORMAT_VERSIONS[self.tag_format]
+
+    def get_limits(self) -> dict:
+        '''Per-mesh limits, keyed like the counts checked against them'''
+        return {'vertices': self.limit_vertices, 'triangles': self.limit_triangles}
+
+    def get_density(self) -> float:
+        '''Density of the surface property in kg/m³'''
+        prop = SourcePreferences.get().get_surfaceprops().get(self.surfaceprop)
+        return prop.density if prop is not None and prop.density > 0 else DEFAULT_DENSITY
+
+    def get_scale(self) -> float:
+        '''Hammer Units per Blender meter'''
+        return self.scale if self.scale_mode == 'CUSTOM' else SCALES.get(self.scale_mode, 1.0)
+
     @property
     def data_path(self):
         return f'collection.sourcery_data'
@@ -86,6 +257,56 @@ class CollectionData(PropertyGroup):
         layout.prop(self, 'scale_mode')
         if self.scale_mode == 'CUSTOM':
             layout.prop(self, 'scale')
+        layout.prop(self, 'tag_format')
+        layout.prop(self, 'compute_bounds')
+
+        header, body = layout.panel('SRC_collision_options', default_closed=True)
+        header.label(text='Collision')
+        if body:
+            body.prop(self, 'collision')
+            body.prop(self, 'generate_hulls')
+            body.prop(self, 'fit_boxes')
+            body.prop(self, 'compute_mass')
+            body.prop(self, 'decompose')
+            col = body.column()
+            col.active = self.decompose
+            col.prop(self, 'decompose_pieces')
+            col.prop(self, 'decompose_vertices')
+            col.prop(self, 'decompose_resolution')
+            body.prop(self, 'resolve_auto')
+            col = body.column()
+            col.active = self.resolve_auto
+            col.prop(self, 'auto_box_fill')
+            col.prop(self, 'auto_hull_size')
+            col.prop(self, 'auto_mesh_triangles')
+
+        header, body = layout.panel('SRC_limit_options', default_closed=True)
+        header.label(text='Limits')
+        if body:
+            body.prop(self, 'split_meshes')
+            body.prop(self, 'limit_vertices')
+            body.prop(self, 'limit_triangles')
+            body.prop(self, 'limit_convex_pieces')
+
+        header, body = layout.panel('SRC_lod_options', default_closed=True)
+        header.label(text='LODs')
+        if body:
+            body.prop(self, 'generate_lods')
+            col = body.column()
+            col.active = self.generate_lods
+            col.context_pointer_set('collection', context.collection)
+            level = lists.draw_list(col, LODLevelList.bl_idname, self, 'lods', self, 'lods_active')
+            if level is not None:
+                col.prop(level, 'ratio')
+                col.prop(level, 'switch_point')
+
+        header, body = layout.panel('SRC_optimize_options', default_closed=True)
+        header.label(text='Optimization')
+        if body:
+            body.prop(self, 'optimize_meshes')
+            col = body.column()
+            col.active = self.optimize_meshes
+            col.prop(self, 'vertex_cache_size')
 
         # temp_override doesn't fucking work for operators so we have to use this undocumented shit
         # https://blender.stackexchange.com/a/203443
@@ -96,14 +317,16 @@ class CollectionData(PropertyGroup):
         if path is not None:
             col = layout.column()
             col.prop(path, 'path')
-        
-        #layout.prop_search(
-        #    data, 'surfaceprop',
-        #    prefs, 'surfaceprops',
-        #    text='Surface Property',
-        #    results_are_suggestions=True,
-        #    icon='PLAY_SOUND'
-        #)
+
+        prefs = SourcePreferences.get()
+        prefs.get_surfaceprops()    # Read from the game on first use
+        layout.prop_search(
+            self, 'surfaceprop',
+            prefs, 'surfaceprops',
+            text='Surface Property',
+            results_are_suggestions=True,
+            icon='PLAY_SOUND'
+        )
 
 class ObjectData(PropertyGroup):
     visible: BoolProperty(name='Visible', default=True)
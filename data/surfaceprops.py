@@ -1,9 +1,10 @@
 import bpy
 from bpy.types import PropertyGroup
-from bpy.props import StringProperty
+from bpy.props import StringProperty, FloatProperty
 
 class SurfaceProp(PropertyGroup):
     name: StringProperty(name='Name', default='default')
+    density: FloatProperty(name='Density', description='Density in kg/m³, or 0 if unknown', default=0.0)
 
 SURFACEPROPS = [
     'default',
@@ -92,4 +93,23 @@ SURFACEPROPS = [
     'ceiling_tile',
     'computer',
     'pottery',
-]
\ No newline at end of file
+]
+
+
+def sync_surfaceprops(collection, densities: dict[str, float]):
+    '''
+    Update a collection of SurfaceProp to match {name: density}, only touching
+    entries that changed. Existing entries keep their order, new ones are added at the end.
+    '''
+    for i in reversed(range(len(collection))):
+        if collection[i].name not in densities:
+            collection.remove(i)
+
+    existing = {prop.name: prop for prop in collection}
+    for name, density in densities.items():
+        prop = existing.get(name)
+        if prop is None:
+            prop = collection.add()
+            prop.name = name
+        if prop.density != density:
+            prop.density = density
@@ -0,0 +1,146 @@
+import bpy
+from bisect import bisect_right, insort
+from bpy.app.handlers import persistent
+from bpy.types import Object
+from .scene import ObjectData
+
+def tag_key(obj: Object):
+    '''(collision_mode, visible) of a tagged object, or None if it has no tags'''
+    data = getattr(obj, 'sourcery_data', None)
+    if not data or data.is_empty():
+        return None
+    return (data.collision_mode, data.visible)
+
+class TagIndex:
+    '''
+    Index of tagged objects, grouped by collision mode and visibility,
+    so the UI doesn't have to scan every object in the file.
+    '''
+
+    def __init__(self):
+        self.keys = {}          # object name -> (collision_mode, visible)
+        self.groups = {}        # (collision_mode, visible) -> set of object names
+        self.positions = {}     # object name -> index in bpy.data.objects
+        self.sorted = []        # sorted positions of tagged objects
+        self.count = -1         # len(bpy.data.objects) at last rebuild
+
+    def invalidate(self):
+        self.count = -1
+
+    def ensure(self):
+        if self.count != len(bpy.data.objects):
+            self.rebuild()
+
+    def rebuild(self):
+        self.keys.clear()
+        self.groups.clear()
+        self.positions.clear()
+        for i, obj in enumerate(bpy.data.objects):
+            self.positions[obj.name] = i
+            self.set_key(obj.name, tag_key(obj))
+        self.sorted = sorted(self.positions[name] for name in self.keys)
+        self.count = len(bpy.data.objects)
+
+    def set_key(self, name, key):
+        old = self.keys.get(name)
+        if old == key:
+            return False
+        if old is not None:
+            self.groups[old].discard(name)
+            del self.keys[name]
+        if key is not None:
+            self.groups.setdefault(key, set()).add(name)
+            self.keys[name] = key
+        return True
+
+    def update(self, obj: Object):
+        '''Refresh the tags of a single object'''
+        if self.count < 0:
+            return
+        if obj.name not in self.positions:
+            return self.invalidate()    # New or renamed object
+        old, key = self.keys.get(obj.name), tag_key(obj)
+        if self.set_key(obj.name, key):
+            if old is None:
+                insort(self.sorted, self.positions[obj.name])
+            elif key is None:
+                self.sorted.remove(self.positions[obj.name])
+
+    # Queries
+    ###########################################################################
+
+    def items(self):
+        '''(object name, position, (collision_mode, visible)) of each tagged object'''
+        self.ensure()
+        objects = bpy.data.objects
+        for name in self.keys:
+            pos = self.positions[name]
+            if pos >= len(objects) or objects[pos].name != name:
+                self.rebuild()  # Objects were renamed or reordered
+                break
+        return [(name, self.positions[name], key) for name, key in self.keys.items()]
+
+    def objects(self, collision_mode=None, visible=None):
+        self.ensure()
+        objects = []
+        for (mode, vis), names in self.groups.items():
+            if collision_mode is not None and mode != collision_mode:
+                continue
+            if visible is not None and vis != visible:
+                continue
+            for name in names:
+                obj = bpy.data.objects.get(name)
+                if obj is None:
+                    self.invalidate()
+                else:
+                    objects.append(obj)
+        return objects
+
+    def last_tagged(self, position):
+        '''Position of the last tagged object at or before position, or -1'''
+        self.ensure()
+        i = bisect_right(self.sorted, position)
+        return self.sorted[i - 1] if i > 0 else -1
+
+tag_index = TagIndex()
+
+###############################################################################
+
+@persistent
+def on_depsgraph_update(scene, depsgraph):
+    for update in depsgraph.updates:
+        if isinstance(update.id, Object):
+            tag_index.update(update.id.original)
+
+@persistent
+def on_invalidate(*args):
+    tag_index.invalidate()
+
+@persistent
+def on_load(*args):
+    tag_index.invalidate()
+    subscribe()
+
+def subscribe():
+    # Tags edited through the UI
+    for prop in ('collision_mode', 'visible'):
+        bpy.msgbus.subscribe_rna(key=(ObjectData, prop), owner=tag_index, args=(), notify=on_invalidate)
+
+HANDLERS = (
+    (bpy.app.handlers.depsgraph_update_post, on_depsgraph_update),
+    (bpy.app.handlers.load_post, on_load),
+    (bpy.app.handlers.undo_post, on_invalidate),
+    (bpy.app.handlers.redo_post, on_invalidate),
+)
+
+def register():
+    for handlers, handler in HANDLERS:
+        if handler not in handlers:
+            handlers.append(handler)
+    subscribe()
+
+def unregister():
+    for handlers, handler in HANDLERS:
+        if handler in handlers:
+            handlers.remove(handler)
+    bpy.msgbus.clear_by_owner(tag_index)
@@ -0,0 +1,74 @@
+import numpy as np
+from bpy.types import Depsgraph
+from .meshes import evaluated_mesh, mesh_triangles
+from ..geometry.analysis import MeshStats, mesh_stats
+from ..geometry.mass import MassProperties, mass_properties
+
+def world_space(positions, matrix_world) -> np.ndarray:
+    matrix = np.array(matrix_world, dtype=np.float64)
+    return positions @ matrix[:3, :3].T + matrix[:3, 3]
+
+class WorldMeshes:
+    '''
+    Evaluated triangles of mesh objects in world space, concatenated so every
+    analysis of an export runs batched over one set of arrays. Empty meshes are skipped.
+    '''
+
+    def __init__(self, objects, depsgraph: Depsgraph):
+        meshes = []
+        for obj in objects:
+            if obj.type != 'MESH':
+                continue
+            with evaluated_mesh(obj, depsgraph) as mesh:
+                verts, tris = mesh_triangles(mesh)
+            meshes.append((obj.name, world_space(verts, obj.matrix_world), tris))
+        self.concatenate(meshes)
+
+    @staticmethod
+    def from_meshes(meshes) -> 'WorldMeshes':
+        '''World space meshes from (name, positions, triangles) that were evaluated elsewhere'''
+        world = WorldMeshes.__new__(WorldMeshes)
+        world.concatenate(meshes)
+        return world
+
+    def concatenate(self, meshes):
+        '''Fill the arrays from (name, positions, triangles), skipping empty meshes'''
+        meshes = [(name, positions, triangles) for name, positions, triangles in meshes if len(positions)]
+        self.names = [name for name, _, _ in meshes]
+        positions = [p for _, p, _ in meshes]
+        triangles = [t for _, _, t in meshes]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.vertex_counts = np.array([len(p) for p in positions], dtype=np.int64)
+        self.triangle_counts = np.array([len(t) for t in triangles], dtype=np.int64)
+        self.positions = np.concatenate(positions) if positions else np.empty((0, 3))
+        self.triangles = np.concatenate(triangles) if triangles else np.empty((0, 3), np.int32)
+        self.vertex_starts = np.concatenate([[0], np.cumsum(self.vertex_counts)])
+        self.triangle_starts = np.concatenate([[0], np.cumsum(self.triangle_counts)])
+
+    def __len__(self):
+        return len(self.names)
+
+    def mesh(self, name):
+        '''World space positions and local triangles of one mesh'''
+        i = self.index[name]
+        return (
+            self.positions[self.vertex_starts[i]:self.vertex_starts[i + 1]],
+            self.triangles[self.triangle_starts[i]:self.triangle_starts[i + 1]],
+        )
+
+    def stats(self, scale=1.0) -> MeshStats:
+        '''Bounds, volume and triangle counts of each mesh, multiplied by scale (e.g. to Hammer Units)'''
+        return mesh_stats(self.positions * scale, self.triangles, self.vertex_counts, self.triangle_counts)
+
+    def mass(self) -> MassProperties:
+        '''Volume, center of mass and inertia of each mesh, in meters'''
+        return mass_properties(self.positions, self.triangles, self.vertex_counts, self.triangle_counts)
+
+    def mesh_mask(self, names) -> np.ndarray:
+        mask = np.zeros(len(self.names), dtype=bool)
+        mask[[self.index[name] for name in names if name in self.index]] = True
+        return mask
+
+    def vertex_mask(self, names) -> np.ndarray:
+        '''Which vertices belong to the named objects'''
+        return np.repeat(self.mesh_mask(names), self.vertex_counts)
@@ -0,0 +1,178 @@
+'''
+Headless batch exporter. Exports every Sourcery model in a .blend file,
+one model per background Blender process. Models that share a custom
+collision collection are exported by the same process, so its geometry is
+only evaluated once:
+
+    blender -b file.blend --python-expr "from bl_ext.user_default.sourcery.export import batch; batch.main()" -- --jobs 8 --report report.json
+
+Arguments after '--':
+    --jobs N            Number of Blender workers (default: CPU count)
+    --report PATH       Write the JSON report here (default: stdout)
+    --model NAME        Only export this model. Can be repeated.
+    --changed           Skip models that are unchanged since the last export
+    --timeout SECONDS   Kill a worker after this long (default: none)
+'''
+import os
+import bpy
+import sys
+import json
+import time
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from .exporters import iter_src_models, export_model
+from .proxies import proxy_cache
+
+RESULT_PREFIX = 'SOURCERY_RESULT:'
+
+def parse_args(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+
+    parser = argparse.ArgumentParser(prog='sourcery.export.batch')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--report', default=None)
+    parser.add_argument('--model', action='append', default=[])
+    parser.add_argument('--changed', action='store_true')
+    parser.add_argument('--timeout', type=float, default=None)
+    parser.add_argument('--worker', action='append', default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+# Worker
+###############################################################################
+
+def worker_main(argv=None):
+    '''Entry point for a background Blender process that exports a group of models'''
+    args = parse_args(argv)
+    results = {name: {'model': name, 'status': 'missing', 'elapsed': 0.0} for name in args.worker}
+
+    # The group's models share their custom collision between exports
+    with proxy_cache.scope():
+        for collection, idx in iter_src_models():
+            result = results.get(collection.name)
+            if result is None or result['status'] != 'missing':
+                continue
+            start = time.perf_counter()
+            result['filepath'] = bpy.path.abspath(collection.exporters[idx].export_properties.filepath)
+            try:
+                result['status'] = 'ok' if export_model(collection, idx) else 'failed'
+            except Exception as e:
+                result['status'] = 'failed'
+                result['error'] = str(e)
+            result['elapsed'] = time.perf_counter() - start
+
+    for result in results.values():
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+    sys.exit(0 if all(r['status'] == 'ok' for r in results.values()) else 1)
+
+def worker_command(names):
+    return [
+        bpy.app.binary_path, '--background', bpy.data.filepath,
+        '--python-expr', f'from {__name__} import worker_main; worker_main()',
+        '--', *(arg for name in names for arg in ('--worker', name)),
+    ]
+
+def run_worker(names, timeout):
+    start = time.perf_counter()
+    results = {name: {'model': name, 'status': 'failed'} for name in names}
+    try:
+        proc = subprocess.run(worker_command(names), capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        for result in results.values():
+            result.update(status='timeout', returncode=None)
+    else:
+        for line in proc.stdout.splitlines():
+            if line.startswith(RESULT_PREFIX):
+                result = json.loads(line[len(RESULT_PREFIX):])
+                results.get(result['model'], {}).update(result)
+        for result in results.values():
+            result['returncode'] = proc.returncode
+            if proc.returncode != 0 and result['status'] != 'ok':
+                result['status'] = 'failed'
+                result['log'] = (proc.stdout + proc.stderr)[-4000:]
+
+    # Include process startup and file load time, shared by the group
+    for result in results.values():
+        result['wall_time'] = time.perf_counter() - start
+    return list(results.values())
+
+def worker_groups(models, jobs) -> list[list[str]]:
+    '''
+    Model names for each worker. Models that share a custom collision collection
+    go to the same worker, in chunks small enough to keep every job busy.
+    '''
+    groups = {}
+    for collection, _ in models:
+        proxy = collection.sourcery_data.collision
+        shared = proxy is not None and proxy != collection and proxy not in collection.children_recursive
+        key = ('proxy', proxy.name) if shared else ('model', collection.name)
+        groups.setdefault(key, []).append(collection.name)
+
+    size = max(1, -(-len(models) // max(1, jobs)))
+    return [names[i:i + size] for names in groups.values() for i in range(0, len(names), size)]
+
+# Coordinator
+###############################################################################
+
+def main(argv=None):
+    '''Entry point for the coordinating Blender process'''
+    args = parse_args(argv)
+    if args.worker:
+        return worker_main(argv)
+
+    if not bpy.data.filepath:
+        print("[Sourcery] Error: Batch export requires a saved .blend file")
+        sys.exit(2)
+
+    start = time.perf_counter()
+    models = [(c, idx) for c, idx in iter_src_models() if not args.model or c.name in args.model]
+    skipped = []
+
+    if args.changed:
+        from .fingerprint import FingerprintCache, fingerprint_collection
+        cache = FingerprintCache.for_blend()
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        fingerprints = {}
+        for collection, idx in models:
+            exp = collection.exporters[idx]
+            fingerprint = fingerprint_collection(collection, exp, depsgraph)
+            if cache.is_current(collection, bpy.path.abspath(exp.export_properties.filepath), fingerprint):
+                skipped.append(collection.name)
+            fingerprints[collection.name] = (collection, fingerprint)
+        models = [(c, idx) for c, idx in models if c.name not in skipped]
+
+    groups = worker_groups(models, args.jobs)
+    print(f"[Sourcery] Exporting {len(models)} models in {len(groups)} groups with {args.jobs} workers ({len(skipped)} unchanged)")
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        results = [r for group in pool.map(lambda names: run_worker(names, args.timeout), groups) for r in group]
+
+    for result in results:
+        print(f"[Sourcery] {result['status']:>7} {result['wall_time']:8.2f}s  {result['model']}")
+
+    if args.changed:
+        for result in results:
+            if result['status'] == 'ok':
+                collection, fingerprint = fingerprints[result['model']]
+                cache.update(collection, result['filepath'], fingerprint)
+        cache.save()
+
+    failed = [r['model'] for r in results if r['status'] != 'ok']
+    report = {
+        'file': bpy.data.filepath,
+        'jobs': args.jobs,
+        'elapsed': time.perf_counter() - start,
+        'exported': len(results) - len(failed),
+        'failed': failed,
+        'skipped': skipped,
+        'models': results,
+    }
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,71 @@
+'''
+Compares the fast path exporter with the glTF add-on on the models in a .blend file:
+
+    blender -b file.blend --python-expr "from bl_ext.user_default.sourcery.export import benchmark; benchmark.main()" -- --runs 3
+
+Arguments after '--':
+    --runs N            Exports per model and path, the fastest is reported (default: 3)
+    --model NAME        Only benchmark this model. Can be repeated.
+    --report PATH       Write the JSON report here (default: stdout)
+
+Files are written to a temporary folder, the models' own export paths are left alone.
+'''
+import os
+import bpy
+import sys
+import json
+import time
+import argparse
+import tempfile
+from .exporters import iter_src_models, export_model
+
+def parse_args(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+
+    parser = argparse.ArgumentParser(prog='sourcery.export.benchmark')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--model', action='append', default=[])
+    parser.add_argument('--report', default=None)
+    return parser.parse_args(argv)
+
+def time_export(collection, idx, filepath, fast, runs):
+    '''Fastest of several exports of a model, and the size of the file'''
+    props = collection.exporters[idx].export_properties
+    old = props.filepath, props.fast_export, props.export_format
+    props.filepath, props.fast_export, props.export_format = filepath, fast, 'GLB'
+    try:
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            if not export_model(collection, idx):
+                return None
+            times.append(time.perf_counter() - start)
+    finally:
+        props.filepath, props.fast_export, props.export_format = old
+    return {'time': min(times), 'size': os.path.getsize(filepath)}
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    with tempfile.TemporaryDirectory(prefix='sourcery-benchmark-') as tmp:
+        for collection, idx in iter_src_models():
+            if args.model and collection.name not in args.model:
+                continue
+            result = {'model': collection.name}
+            for key, fast in (('stock', False), ('fast', True)):
+                result[key] = time_export(collection, idx, os.path.join(tmp, f'{key}.glb'), fast, args.runs)
+            if result['stock'] and result['fast']:
+                result['speedup'] = result['stock']['time'] / result['fast']['time']
+                print(f"[Sourcery] {collection.name}: {result['stock']['time'] * 1000:8.1f}ms -> "
+                      f"{result['fast']['time'] * 1000:8.1f}ms ({result['speedup']:.1f}x)")
+            else:
+                print(f"[Sourcery] {collection.name}: export failed")
+            results.append(result)
+
+    report = {'file': bpy.data.filepath, 'runs': args.runs, 'models': results}
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,118 @@
+import numpy as np
+from bpy.types import Depsgraph, Object
+from .meshes import evaluated_mesh, mesh_triangles, foreach_array
+from ..data.scene import FACE_COLLISION_ATTRIBUTE, FACE_COLLISION_MODES
+from .fingerprint import mesh_digest
+from ..geometry.hull import convex_hull
+from ..geometry.obb import oriented_box
+from ..util.cache import ArrayCache
+from ..util.workers import parallel_map
+
+# Bump when the hull algorithm changes to ignore old cache entries
+HULL_VERSION = 1
+
+DECOMPOSE_VERSION = 1
+
+hull_cache = ArrayCache('hulls')
+decomposition_cache = ArrayCache('decompositions')
+
+def object_hull(obj: Object, depsgraph: Depsgraph):
+    '''
+    Convex hull of an object's evaluated mesh in object space as (vertices, triangles),
+    or None if the mesh is flat or empty. Cached on disk by mesh content.
+    '''
+    with evaluated_mesh(obj, depsgraph) as mesh:
+        key = f'{HULL_VERSION}-{mesh_digest(mesh)}'
+        cached = hull_cache.get(key)
+        if cached is not None:
+            return (cached['vertices'], cached['triangles']) if len(cached['triangles']) else None
+        positions, _ = mesh_triangles(mesh)
+
+    hull = convex_hull(positions)
+    if hull is None:
+        # Remember degenerate meshes too
+        hull_cache.put(key, vertices=np.empty((0, 3), np.float32), triangles=np.empty((0, 3), np.uint32))
+        return None
+
+    vertices, triangles = hull[0].astype(np.float32), hull[1]
+    hull_cache.put(key, vertices=vertices, triangles=triangles)
+    return vertices, triangles
+
+def object_box(obj: Object, depsgraph: Depsgraph):
+    '''Tight oriented box (center, axes, half extents) around an object in object space'''
+    hull = object_hull(obj, depsgraph)
+    if hull is None:
+        return None
+    return oriented_box(*hull)
+
+def has_face_collision(obj: Object) -> bool:
+    '''Cheap check on the original mesh before evaluating it'''
+    return obj.type == 'MESH' and FACE_COLLISION_ATTRIBUTE in obj.data.attributes
+
+def face_collision_parts(obj: Object, depsgraph: Depsgraph) -> dict | None:
+    '''
+    Parts of an object's evaluated mesh for each face collision mode, as
+    {mode number: (vertices, triangles)} in object space. None if every face
+    is left on Auto.
+    '''
+    with evaluated_mesh(obj, depsgraph) as mesh:
+        attr = mesh.attributes.get(FACE_COLLISION_ATTRIBUTE)
+        if attr is None or attr.domain != 'FACE' or attr.data_type != 'INT':
+            return None
+        modes = foreach_array(attr.data, 'value', 1, np.int32)
+        if not modes.any():
+            return None
+        positions, triangles = mesh_triangles(mesh)
+        triangle_modes = modes[foreach_array(mesh.loop_triangles, 'polygon_index', 1, np.int32)]
+
+    parts = {}
+    for mode in np.unique(triangle_modes):
+        used, local = np.unique(triangles[triangle_modes == mode], return_inverse=True)
+        parts[int(mode)] = (positions[used], local.reshape(-1, 3))
+    return parts
+
+def face_part_name(name, number) -> str:
+    '''Name of the collision node for one face collision mode of an object'''
+    return f'{name}_{FACE_COLLISION_MODES.get(number, "auto")}'
+
+def decompose_objects(objects, depsgraph: Depsgraph, max_pieces, max_vertices, resolution) -> dict:
+    '''
+    Convex pieces of each object's evaluated mesh in object space, as
+    {name: [(vertices, triangles), ...]}. Uncached meshes are decomposed
+    in parallel worker processes.
+    '''
+    settings = (max_pieces, max_vertices, resolution)
+    results, jobs = {}, {}
+    for obj in objects:
+        with evaluated_mesh(obj, depsgraph) as mesh:
+            key = f'{DECOMPOSE_VERSION}-{"-".join(map(str, settings))}-{mesh_digest(mesh)}'
+            cached = decomposition_cache.get(key)
+            if cached is not None:
+                results[obj.name] = unpack_pieces(cached)
+                continue
+            positions, triangles = mesh_triangles(mesh)
+        jobs[obj.name] = (key, positions, triangles)
+
+    if jobs:
+        pieces = parallel_map(
+            'geometry.decompose.convex_decomposition',
+            [(positions, triangles, *settings) for _, positions, triangles in jobs.values()]
+        )
+        for (name, (key, _, _)), result in zip(jobs.items(), pieces):
+            decomposition_cache.put(key, **pack_pieces(result))
+            results[name] = result
+    return results
+
+def pack_pieces(pieces) -> dict:
+    '''Concatenate pieces into flat arrays for the cache'''
+    return {
+        'vertices': np.concatenate([v for v, _ in pieces]) if pieces else np.empty((0, 3), np.float32),
+        'triangles': np.concatenate([t for _, t in pieces]) if pieces else np.empty((0, 3), np.uint32),
+        'vertex_counts': np.array([len(v) for v, _ in pieces], dtype=np.int64),
+        'triangle_counts': np.array([len(t) for _, t in pieces], dtype=np.int64),
+    }
+
+def unpack_pieces(arrays) -> list:
+    vertices = np.split(arrays['vertices'], np.cumsum(arrays['vertex_counts'])[:-1])
+    triangles = np.split(arrays['triangles'], np.cumsum(arrays['triangle_counts'])[:-1])
+    return [(v, t) for v, t in zip(vertices, triangles)] if len(arrays['vertex_counts']) else []
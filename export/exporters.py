@@ -0,0 +1,154 @@
+import bpy
+from bisect import bisect_right, insort
+from bpy.app.handlers import persistent
+from bpy.types import Collection, Scene
+
+SRC_EXPORTER_TYPE = 'EXPORT_SCENE_OT_src_gltf'
+
+def is_src_exporter(collection: Collection, idx: int):
+    exporters = collection.exporters
+    return idx < len(exporters) and exporters[idx].export_properties.__class__.__name__ == SRC_EXPORTER_TYPE
+
+def find_src_exporter_index(collection: Collection):
+    for i, exp in enumerate(collection.exporters):
+        if exp.export_properties.__class__.__name__ == SRC_EXPORTER_TYPE:
+            return i
+    return None
+
+class ModelRegistry:
+    '''
+    Maps collections to the index of their Sourcery exporter so the Models tab
+    doesn't have to check the exporters of every collection on each redraw.
+    '''
+
+    def __init__(self):
+        self.models = {}        # collection name -> exporter index
+        self.positions = {}     # collection name -> index in bpy.data.collections
+        self.sorted = []        # sorted positions of collections with an exporter
+        self.scenes = {}        # scene name -> names of collections in the scene
+        self.count = -1         # len(bpy.data.collections) at last rebuild
+
+    def invalidate(self):
+        self.count = -1
+        self.scenes.clear()
+
+    def ensure(self):
+        if self.count != len(bpy.data.collections):
+            self.rebuild()
+
+    def rebuild(self):
+        self.models.clear()
+        self.positions.clear()
+        for i, collection in enumerate(bpy.data.collections):
+            self.positions[collection.name] = i
+            idx = find_src_exporter_index(collection)
+            if idx is not None:
+                self.models[collection.name] = idx
+        self.sorted = sorted(self.positions[name] for name in self.models)
+        self.scenes.clear()
+        self.count = len(bpy.data.collections)
+
+    def update(self, collection: Collection):
+        '''Refresh the exporter of a single collection'''
+        if self.count < 0:
+            return
+        if collection.name not in self.positions:
+            return self.invalidate()    # New or renamed collection
+        pos = self.positions[collection.name]
+        old, idx = self.models.get(collection.name), find_src_exporter_index(collection)
+        if idx is not None:
+            self.models[collection.name] = idx
+            if old is None:
+                insort(self.sorted, pos)
+        elif old is not None:
+            del self.models[collection.name]
+            self.sorted.remove(pos)
+
+    # Queries
+    ###########################################################################
+
+    def index(self, collection: Collection):
+        self.ensure()
+        if collection.name not in self.positions:
+            self.rebuild()
+        idx = self.models.get(collection.name)
+        if (idx is None and len(collection.exporters) > 0) or (idx is not None and not is_src_exporter(collection, idx)):
+            # Exporters were added or reordered behind our back
+            self.update(collection)
+            idx = self.models.get(collection.name)
+        return idx
+
+    def items(self):
+        '''(collection name, position, exporter index) of each model'''
+        self.ensure()
+        collections = bpy.data.collections
+        for name in self.models:
+            pos = self.positions[name]
+            if pos >= len(collections) or collections[pos].name != name:
+                self.rebuild()  # Collections were renamed or reordered
+                break
+        return [(name, self.positions[name], idx) for name, idx in self.models.items()]
+
+    def scene_collections(self, scene: Scene):
+        names = self.scenes.get(scene.name)
+        if names is None:
+            names = self.scenes[scene.name] = {c.name for c in scene.collection.children_recursive}
+        return names
+
+    def last_model(self, position):
+        '''Position of the last collection with an exporter at or before position, or -1'''
+        self.ensure()
+        i = bisect_right(self.sorted, position)
+        return self.sorted[i - 1] if i > 0 else -1
+
+model_registry = ModelRegistry()
+
+###############################################################################
+
+def get_src_exporter(collection: Collection):
+    idx = model_registry.index(collection)
+    return collection.exporters[idx] if idx is not None else None
+
+def get_src_exporter_index(collection: Collection):
+    return model_registry.index(collection)
+
+def iter_src_models():
+    '''Yield (collection, exporter index) for every collection with a Sourcery exporter'''
+    for name, pos, idx in model_registry.items():
+        yield bpy.data.collections[pos], idx
+
+def export_model(collection: Collection, idx: int) -> bool:
+    with bpy.context.temp_override(collection=collection):
+        result = bpy.ops.collection.exporter_export(index=idx)
+    return 'FINISHED' in result
+
+###############################################################################
+
+@persistent
+def on_depsgraph_update(scene, depsgraph):
+    for update in depsgraph.updates:
+        if isinstance(update.id, Collection):
+            model_registry.update(update.id.original)
+        elif isinstance(update.id, Scene):
+            model_registry.scenes.clear()
+
+@persistent
+def on_invalidate(*args):
+    model_registry.invalidate()
+
+HANDLERS = (
+    (bpy.app.handlers.depsgraph_update_post, on_depsgraph_update),
+    (bpy.app.handlers.load_post, on_invalidate),
+    (bpy.app.handlers.undo_post, on_invalidate),
+    (bpy.app.handlers.redo_post, on_invalidate),
+)
+
+def register():
+    for handlers, handler in HANDLERS:
+        if handler not in handlers:
+            handlers.append(handler)
+
+def unregister():
+    for handlers, handler in HANDLERS:
+        if handler in handlers:
+            handlers.remove(handler)
@@ -0,0 +1,126 @@
+import os
+import bpy
+import time
+import tempfile
+import numpy as np
+from contextlib import nullcontext
+from types import SimpleNamespace
+from bpy.types import Collection, Depsgraph, Object
+from .meshes import mesh_primitives
+from .glb import GLBWriter
+from .session import ExportSession
+from . import gltf_builder
+from ..util.profiling import MemoryLimitError, check_memory, get_peak_rss
+
+# Fast path for the static props Sourcery exports: no morphs, skins, animations
+# or textures. Mesh data is read with foreach_get, welded and split by material
+# with NumPy, then written straight to a GLB.
+
+def can_fast_export(operator) -> str | None:
+    '''Reason the fast path can't handle an export, or None if it can'''
+    if operator.export_format != 'GLB':
+        return 'only GLB files are supported'
+    if not operator.collection:
+        return 'only collection exports are supported'
+    if operator.export_morph or operator.export_skins or operator.export_animations:
+        return 'morphs, skins and animations are not supported'
+    if operator.export_image_format != 'NONE':
+        return 'textures are not supported'
+    if getattr(operator, 'at_collection_center', False):
+        return 'exporting at the collection center is not supported'
+    # The fast path writes every mesh of the collection, it can't filter them
+    for option in ('use_selection', 'use_visible', 'use_renderable', 'use_active_collection'):
+        if getattr(operator, option, False):
+            return f"the '{option}' option is not supported"
+    collection = bpy.data.collections.get(operator.collection)
+    if collection is not None:
+        for obj in collection.all_objects:
+            if obj.instance_type == 'COLLECTION' and obj.instance_collection:
+                return 'collection instances are not supported'
+            if obj.type != 'MESH':
+                return f"only mesh objects are supported, '{obj.name}' is {obj.type.lower()}"
+    return None
+
+def export_settings_for(operator, collection: Collection) -> dict:
+    '''The subset of the glTF exporter's settings the Sourcery hooks read'''
+    return {
+        'gltf_collection': collection.name,
+        'gltf_yup': operator.export_yup,
+        'gltf_apply': operator.export_apply,
+        'gltf_normals': operator.export_normals,
+        'gltf_tangents': operator.export_tangents and operator.export_normals,
+        'gltf_texcoords': operator.export_texcoords,
+        'gltf_colors': operator.export_all_vertex_colors,
+    }
+
+def fast_export(operator, filepath, stream=False, memory_limit=0) -> dict:
+    '''
+    Export the operator's collection to a GLB. Returns timings and memory use for the log.
+
+    When streaming, each object's mesh is evaluated, written to a spool file next
+    to the output and freed before the next one along with its LODs, face
+    collision parts and convex pieces, so only one mesh is held at a time.
+    memory_limit is in bytes, the export stops with a MemoryLimitError above it,
+    checked before and after the analysis stages and after each object.
+    '''
+    start = time.perf_counter()
+    collection = bpy.data.collections[operator.collection]
+    settings = export_settings_for(operator, collection)
+    session = ExportSession.begin(settings, stream, memory_limit)
+    depsgraph = session.depsgraph
+
+    with (tempfile.TemporaryFile(dir=os.path.dirname(filepath) or None) if stream else nullcontext()) as spool:
+        writer = GLBWriter(stream=spool)
+        for obj in collection.all_objects:
+            if obj.type != 'MESH':
+                continue
+            node = object_node(obj, depsgraph, settings)
+            if node is None:
+                continue
+            session.gather_mesh(node.mesh)
+            session.gather_node(node, obj)
+            writer.add_nodes([node])
+            if stream:
+                release_meshes(node)
+                session.release(obj.name)
+            check_memory(memory_limit, f"'{obj.name}'")
+        gathered = time.perf_counter()
+
+        extension = session.scene_extension(SimpleNamespace(nodes=writer.nodes))
+        writer.write(filepath, extension)
+
+    end = time.perf_counter()
+    return {'gather': gathered - start, 'write': end - gathered, 'total': end - start, 'peak_rss': get_peak_rss()}
+
+def release_meshes(node):
+    '''Drop a written node's mesh data, the writer only needs the node itself'''
+    node.mesh = None
+    for child in node.children or []:
+        release_meshes(child)
+
+###############################################################################
+
+def object_node(obj: Object, depsgraph: Depsgraph, settings):
+    '''glTF node with the object's mesh, or None if it has no triangles'''
+    source = obj.evaluated_get(depsgraph) if settings['gltf_apply'] else obj
+    mesh = source.to_mesh()
+    try:
+        primitives = mesh_primitives(mesh, obj, settings)
+    finally:
+        source.to_mesh_clear()
+    if not primitives:
+        return None
+
+    node = gltf_builder.make_mesh_node(obj.name, primitives)
+    node.matrix = gltf_matrix(obj.matrix_world, settings)
+    return node
+
+def gltf_matrix(matrix, settings) -> list[float]:
+    '''Column-major glTF matrix of a Blender world matrix'''
+    m = np.array(matrix, dtype=np.float64)
+    if settings['gltf_yup']:
+        axes = np.array([[1, 0, 0], [0, 0, 1], [0, -1, 0]], dtype=np.float64)
+        convert = np.eye(4)
+        convert[:3, :3] = axes
+        m = convert @ m @ convert.T
+    return m.T.ravel().tolist()
@@ -0,0 +1,167 @@
+import bpy
+import json
+import hashlib
+import numpy as np
+from pathlib import Path
+from bpy.types import Collection, Depsgraph, Mesh, Object
+from ..data.scene import CollectionData, ObjectData
+from .meshes import foreach_array, evaluated_mesh
+
+# Bump this to invalidate every cached fingerprint
+FINGERPRINT_VERSION = 2
+
+# foreach_get field and element size for each generic attribute type
+ATTRIBUTE_FIELDS = {
+    'FLOAT':            ('value',   1, np.float32),
+    'INT':              ('value',   1, np.int32),
+    'INT8':             ('value',   1, np.int32),
+    'BOOLEAN':          ('value',   1, np.bool_),
+    'FLOAT2':           ('vector',  2, np.float32),
+    'INT32_2D':         ('value',   2, np.int32),
+    'FLOAT_VECTOR':     ('vector',  3, np.float32),
+    'FLOAT_COLOR':      ('color',   4, np.float32),
+    'BYTE_COLOR':       ('color',   4, np.float32),
+    'QUATERNION':       ('value',   4, np.float32),
+}
+
+###############################################################################
+
+def hash_mesh(h, mesh: Mesh):
+    # Geometry and topology
+    h.update(foreach_array(mesh.vertices, 'co', 3).tobytes())
+    h.update(foreach_array(mesh.loops, 'vertex_index', 1, np.int32).tobytes())
+    h.update(foreach_array(mesh.polygons, 'loop_total', 1, np.int32).tobytes())
+    h.update(foreach_array(mesh.polygons, 'material_index', 1, np.int32).tobytes())
+    h.update(foreach_array(mesh.corner_normals, 'vector', 3).tobytes())
+
+    # UVs, colors and any other user attributes
+    for attr in sorted(mesh.attributes, key=lambda a: a.name):
+        if attr.name.startswith('.') or attr.name == 'position':
+            continue
+        field = ATTRIBUTE_FIELDS.get(attr.data_type)
+        h.update(f'{attr.name}:{attr.domain}:{attr.data_type}'.encode())
+        if field is not None:
+            h.update(foreach_array(attr.data, *field).tobytes())
+
+    for mat in mesh.materials:
+        h.update((mat.name if mat else '').encode())
+
+def mesh_digest(mesh: Mesh) -> str:
+    '''Content hash of a mesh, used as a key for geometry caches'''
+    h = hashlib.sha1()
+    hash_mesh(h, mesh)
+    return h.hexdigest()
+
+def hash_object(h, obj: Object, depsgraph: Depsgraph, instancing=frozenset()):
+    h.update(f'{obj.name}:{obj.type}:{obj.parent.name if obj.parent else ""}'.encode())
+    h.update(np.array(obj.matrix_world, dtype=np.float32).tobytes())
+
+    # Sourcery tags
+    if hasattr(obj, 'sourcery_data'):
+        tags = {}
+        ObjectData.save_to_gltf(obj.sourcery_data, tags)
+        h.update(json.dumps(tags, sort_keys=True).encode())
+
+    # Instanced collections, recursively. instancing holds the collections being
+    # hashed further up, so a collection that instances itself can't recurse forever
+    instance = obj.instance_collection if obj.instance_type == 'COLLECTION' else None
+    if instance:
+        h.update(instance.name.encode())
+        if instance.name in instancing:
+            h.update(b'<cycle>')
+        else:
+            for child in sorted(instance.all_objects, key=lambda o: o.name):
+                hash_object(h, child, depsgraph, instancing | {instance.name})
+
+    # Evaluated geometry
+    if obj.type == 'MESH':
+        with evaluated_mesh(obj, depsgraph) as mesh:
+            hash_mesh(h, mesh)
+
+def hash_properties(h, props):
+    for prop in props.bl_rna.properties:
+        if prop.identifier == 'rna_type' or prop.type == 'POINTER':
+            continue
+        value = getattr(props, prop.identifier, None)
+        # Lists of property groups, like the LOD levels
+        if prop.type == 'COLLECTION':
+            h.update(f'{prop.identifier}[{len(value)}];'.encode())
+            for item in value:
+                hash_properties(h, item)
+            continue
+        if hasattr(value, '__len__') and not isinstance(value, str):
+            value = tuple(value)
+        h.update(f'{prop.identifier}={value!r};'.encode())
+
+def fingerprint_collection(collection: Collection, exporter, depsgraph: Depsgraph) -> str:
+    '''
+    Hash everything that affects the exported file: evaluated geometry,
+    transforms, Sourcery tags and settings, and the exporter settings.
+    '''
+    h = hashlib.sha1()
+    h.update(f'v{FINGERPRINT_VERSION}'.encode())
+
+    data = {}
+    if hasattr(collection, 'sourcery_data'):
+        CollectionData.save_to_gltf(collection.sourcery_data, data)
+        hash_properties(h, collection.sourcery_data)
+        # The density comes from the game's surfaceprops, not the .blend
+        if collection.sourcery_data.compute_mass:
+            h.update(f'density={collection.sourcery_data.get_density()!r};'.encode())
+    h.update(json.dumps(data, sort_keys=True).encode())
+
+    hash_properties(h, exporter.export_properties)
+
+    for obj in sorted(collection.all_objects, key=lambda o: o.name):
+        hash_object(h, obj, depsgraph)
+
+    # Custom collision model
+    collision = collection.sourcery_data.collision if hasattr(collection, 'sourcery_data') else None
+    if collision is not None:
+        h.update(f'collision:{collision.name}'.encode())
+        for obj in sorted(collision.all_objects, key=lambda o: o.name):
+            hash_object(h, obj, depsgraph)
+
+    return h.hexdigest()
+
+###############################################################################
+
+class FingerprintCache:
+    '''Sidecar file next to the .blend storing the fingerprint of each exported model'''
+
+    def __init__(self, path: Path | None):
+        self.path = path
+        self.entries = {}
+
+    @staticmethod
+    def for_blend() -> 'FingerprintCache':
+        if not bpy.data.filepath:
+            return FingerprintCache(None)   # Unsaved file, nothing to compare against
+
+        blend = Path(bpy.data.filepath)
+        cache = FingerprintCache(blend.with_name(blend.stem + '.sourcery.json'))
+        try:
+            with open(cache.path, 'r', encoding='utf-8') as f:
+                cache.entries = json.load(f).get('models', {})
+        except (OSError, ValueError):
+            pass
+        return cache
+
+    def is_current(self, collection: Collection, filepath: str, fingerprint: str) -> bool:
+        entry = self.entries.get(collection.name)
+        if not entry or entry.get('fingerprint') != fingerprint:
+            return False
+        # Re-export if the output file was moved or deleted
+        return entry.get('filepath') == filepath and Path(filepath).exists()
+
+    def update(self, collection: Collection, filepath: str, fingerprint: str):
+        self.entries[collection.name] = {'fingerprint': fingerprint, 'filepath': filepath}
+
+    def save(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({'version': FINGERPRINT_VERSION, 'models': self.entries}, f, indent=1, sort_keys=True)
+        except OSError as e:
+            print(f"[Sourcery] Error: Failed to write export cache '{self.path}': {e}")
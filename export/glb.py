@@ -0,0 +1,170 @@
+import json
+import shutil
+import struct
+from .. import GLTF_EXTENSION_NAME
+
+# Serializes the glTF objects built by the fast path (and by gltf_builder for generated
+# geometry) straight to a GLB file. Only covers what static props use: nodes, meshes,
+# triangle primitives, accessors and named materials.
+
+GLB_MAGIC = b'glTF'
+GLB_VERSION = 2
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+def pad(data: bytes, fill: bytes) -> bytes:
+    return data + fill * (-len(data) % 4)
+
+class GLBWriter:
+    '''
+    Buffer data is kept in memory, or with a stream file it's written out as
+    soon as it's added, so callers can free meshes once their nodes are added.
+    '''
+
+    def __init__(self, generator='Sourcery', stream=None):
+        self.gltf = {
+            'asset': {'version': '2.0', 'generator': generator},
+            'scene': 0,
+            'scenes': [{'nodes': []}],
+            'nodes': [],
+            'meshes': [],
+            'materials': [],
+            'accessors': [],
+            'bufferViews': [],
+        }
+        self.chunks = []
+        self.stream = stream    # Binary file the buffer is spooled to
+        self.length = 0
+        self.node_index = {}    # id(node) -> index
+        self.nodes = []         # glTF node objects, by index
+        self.materials = {}     # material name -> index
+        self.extensions_used = set()
+
+    # Nodes
+    ###########################################################################
+
+    def add_nodes(self, roots):
+        '''Assign indices to nodes and their children, so extensions can refer to them'''
+        for root in roots:
+            self.gltf['scenes'][0]['nodes'].append(self.add_node(root))
+
+    def add_node(self, node) -> int:
+        index = len(self.nodes)
+        self.node_index[id(node)] = index
+        self.nodes.append(node)
+        self.gltf['nodes'].append({})
+        children = [self.add_node(child) for child in node.children or []]
+
+        data = {'name': node.name}
+        if children:
+            data['children'] = children
+        if node.matrix is not None:
+            data['matrix'] = list(node.matrix)
+        for key in ('translation', 'rotation', 'scale'):
+            value = getattr(node, key, None)
+            if value is not None:
+                data[key] = list(value)
+        if node.mesh is not None:
+            data['mesh'] = self.add_mesh(node.mesh)
+        self.gltf['nodes'][index] = data
+        return index
+
+    def write_extensions(self):
+        '''Write node extensions, after the session had a chance to fill them in'''
+        for node, data in zip(self.nodes, self.gltf['nodes']):
+            extensions = self.extensions(node.extensions)
+            if extensions:
+                data['extensions'] = extensions
+
+    def extensions(self, extensions) -> dict:
+        result = {}
+        for name, extension in (extensions or {}).items():
+            # Extension objects from the glTF add-on, or plain dicts
+            result[name] = getattr(extension, 'extension', extension)
+            self.extensions_used.add(name)
+        return result
+
+    # Meshes
+    ###########################################################################
+
+    def add_mesh(self, mesh) -> int:
+        primitives = []
+        for prim in mesh.primitives:
+            data = {
+                'attributes': {name: self.add_accessor(accessor) for name, accessor in prim.attributes.items()},
+                'indices': self.add_accessor(prim.indices),
+            }
+            if prim.material is not None:
+                data['material'] = self.add_material(prim.material)
+            if prim.mode is not None:
+                data['mode'] = prim.mode
+            primitives.append(data)
+        self.gltf['meshes'].append({'name': mesh.name, 'primitives': primitives})
+        return len(self.gltf['meshes']) - 1
+
+    def add_material(self, material) -> int:
+        name = material if isinstance(material, str) else material.name
+        if name not in self.materials:
+            self.materials[name] = len(self.gltf['materials'])
+            self.gltf['materials'].append({'name': name})
+        return self.materials[name]
+
+    def add_accessor(self, accessor) -> int:
+        view = {'buffer': 0, 'byteOffset': self.length, 'byteLength': len(accessor.buffer_view.data)}
+        target = accessor.buffer_view.bufferViewTarget
+        if target is not None:
+            view['target'] = int(target)
+        self.gltf['bufferViews'].append(view)
+        self.append(accessor.buffer_view.data)
+
+        data = {
+            'bufferView': len(self.gltf['bufferViews']) - 1,
+            'componentType': int(accessor.component_type),
+            'count': accessor.count,
+            'type': accessor.type,
+        }
+        for key in ('min', 'max', 'name', 'normalized'):
+            value = getattr(accessor, key)
+            if value is not None:
+                data[key] = value
+        self.gltf['accessors'].append(data)
+        return len(self.gltf['accessors']) - 1
+
+    def append(self, data):
+        data = pad(bytes(data), b'\0')
+        if self.stream is not None:
+            self.stream.write(data)
+        else:
+            self.chunks.append(data)
+        self.length += len(data)
+
+    # Output
+    ###########################################################################
+
+    def write(self, filepath, extension: dict | None = None):
+        if extension is not None:
+            self.gltf['extensions'] = {GLTF_EXTENSION_NAME: extension}
+            self.extensions_used.add(GLTF_EXTENSION_NAME)
+        self.write_extensions()
+        if self.extensions_used:
+            self.gltf['extensionsUsed'] = sorted(self.extensions_used)
+        if self.length:
+            self.gltf['buffers'] = [{'byteLength': self.length}]
+        for key in ('materials', 'accessors', 'bufferViews', 'meshes'):
+            if not self.gltf[key]:
+                del self.gltf[key]
+
+        json_chunk = pad(json.dumps(self.gltf, separators=(',', ':')).encode('utf-8'), b' ')
+        total = 12 + 8 + len(json_chunk) + (8 + self.length if self.length else 0)
+        with open(filepath, 'wb') as f:
+            f.write(struct.pack('<4sII', GLB_MAGIC, GLB_VERSION, total))
+            f.write(struct.pack('<II', len(json_chunk), CHUNK_JSON))
+            f.write(json_chunk)
+            if self.length:
+                f.write(struct.pack('<II', self.length, CHUNK_BIN))
+                if self.stream is not None:
+                    self.stream.flush()
+                    self.stream.seek(0)
+                    shutil.copyfileobj(self.stream, f)
+                for chunk in self.chunks:
+                    f.write(chunk)
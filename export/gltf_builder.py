@@ -0,0 +1,102 @@
+import numpy as np
+
+# Helpers to add generated geometry to a glTF export from the user extension hooks.
+# The glTF modules are imported on use since they're only available during an export.
+
+def make_accessor(array: np.ndarray, data_type, component_type, target, bounds=False):
+    from io_scene_gltf2.io.com import gltf2_io
+    from io_scene_gltf2.io.exp.gltf2_io_binary_data import BinaryData
+
+    return gltf2_io.Accessor(
+        buffer_view=BinaryData(array.tobytes(), bufferViewTarget=target),
+        byte_offset=None,
+        component_type=component_type,
+        count=len(array),
+        extensions=None,
+        extras=None,
+        max=array.max(axis=0).tolist() if bounds and len(array) else None,
+        min=array.min(axis=0).tolist() if bounds and len(array) else None,
+        name=None,
+        normalized=None,
+        sparse=None,
+        type=data_type
+    )
+
+def read_accessor(accessor) -> np.ndarray:
+    '''Data of an accessor the exporter has gathered, as an array with one row per element'''
+    from io_scene_gltf2.io.com.gltf2_io_constants import ComponentType, DataType
+
+    dtype = ComponentType.to_numpy_dtype(accessor.component_type)
+    size = DataType.num_elements(accessor.type)
+    data = np.frombuffer(accessor.buffer_view.data, dtype=dtype, offset=accessor.byte_offset or 0, count=accessor.count * size)
+    return data.reshape(accessor.count, size) if size > 1 else data
+
+def copy_accessor(accessor, array: np.ndarray):
+    '''Accessor like another one, with different data'''
+    copy = make_accessor(
+        np.ascontiguousarray(array),
+        accessor.type, accessor.component_type, accessor.buffer_view.bufferViewTarget,
+        bounds=accessor.max is not None
+    )
+    copy.normalized = accessor.normalized
+    copy.name = accessor.name
+    return copy
+
+def make_primitive(positions: np.ndarray, triangles: np.ndarray, extra_attributes=None):
+    from io_scene_gltf2.io.com import gltf2_io
+    from io_scene_gltf2.io.com.gltf2_io_constants import ComponentType, DataType, BufferViewTarget
+
+    attributes = {
+        'POSITION': make_accessor(
+            np.ascontiguousarray(positions, dtype=np.float32).reshape(-1, 3),
+            DataType.Vec3, ComponentType.Float, BufferViewTarget.ARRAY_BUFFER, bounds=True),
+    }
+    for name, accessor in (extra_attributes or {}).items():
+        attributes[name] = accessor
+
+    return gltf2_io.MeshPrimitive(
+        attributes=attributes,
+        extensions=None,
+        extras=None,
+        indices=make_indices(triangles),
+        material=None,
+        mode=None,
+        targets=None
+    )
+
+def make_indices(triangles: np.ndarray):
+    from io_scene_gltf2.io.com.gltf2_io_constants import ComponentType, DataType, BufferViewTarget
+
+    indices = np.ascontiguousarray(triangles, dtype=np.uint32).reshape(-1)
+    return make_accessor(indices, DataType.Scalar, ComponentType.UnsignedInt, BufferViewTarget.ELEMENT_ARRAY_BUFFER)
+
+def make_mesh_node(name: str, primitives: list, extensions=None, translation=None):
+    '''Node with a mesh made of the given primitives'''
+    from io_scene_gltf2.io.com import gltf2_io
+
+    mesh = gltf2_io.Mesh(
+        extensions=None,
+        extras=None,
+        name=name,
+        primitives=primitives,
+        weights=None
+    )
+    return gltf2_io.Node(
+        camera=None,
+        children=[],
+        extensions=extensions or {},
+        extras=None,
+        matrix=None,
+        mesh=mesh,
+        name=name,
+        rotation=None,
+        scale=None,
+        skin=None,
+        translation=translation,
+        weights=None
+    )
+
+def add_child(gltf2_node, child):
+    if gltf2_node.children is None:
+        gltf2_node.children = []
+    gltf2_node.children.append(child)
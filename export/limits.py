@@ -0,0 +1,50 @@
+import numpy as np
+from bpy.types import Depsgraph
+from . import gltf_builder
+from ..geometry.limits import over_limits, weld, split_triangles
+
+def check_objects(objects, depsgraph: Depsgraph, limits: dict) -> list[str]:
+    '''
+    Check the evaluated meshes of objects against per-mesh limits.
+    Vertex counts are before splitting by normals and UVs, so this only
+    catches meshes that are certainly over. Returns a message per problem.
+    '''
+    meshes = [obj for obj in objects if obj.type == 'MESH']
+    counts = {key: np.zeros(len(meshes), dtype=np.int64) for key in ('vertices', 'triangles')}
+    for i, obj in enumerate(meshes):
+        mesh = obj.evaluated_get(depsgraph).data
+        counts['vertices'][i] = len(mesh.vertices)
+        counts['triangles'][i] = len(mesh.loop_triangles)
+
+    issues = []
+    for key, over in over_limits(counts, limits).items():
+        for i in np.flatnonzero(over):
+            issues.append(f"'{meshes[i].name}' has {counts[key][i]} {key}, over the limit of {limits[key]}")
+    return issues
+
+def split_primitive(prim, max_vertices, max_triangles) -> list:
+    '''
+    Weld duplicate vertices of a triangle list primitive, then split it into
+    primitives that are within the limits if it is still too big.
+    '''
+    from io_scene_gltf2.io.com import gltf2_io
+
+    attributes = {name: gltf_builder.read_accessor(accessor) for name, accessor in prim.attributes.items()}
+    indices = gltf_builder.read_accessor(prim.indices)
+    attributes, indices = weld(attributes, indices)
+
+    primitives = []
+    for used, triangles in split_triangles(indices, max_vertices, max_triangles):
+        primitives.append(gltf2_io.MeshPrimitive(
+            attributes={
+                name: gltf_builder.copy_accessor(prim.attributes[name], array[used])
+                for name, array in attributes.items()
+            },
+            extensions=prim.extensions,
+            extras=prim.extras,
+            indices=gltf_builder.make_indices(triangles),
+            material=prim.material,
+            mode=prim.mode,
+            targets=prim.targets
+        ))
+    return primitives
@@ -0,0 +1,104 @@
+import numpy as np
+from bpy.types import Depsgraph
+from .meshes import WeldedMesh
+from .fingerprint import mesh_digest
+from ..util.cache import ArrayCache
+from ..util.workers import parallel_map
+
+# Bump when decimation changes to ignore old cache entries
+LOD_VERSION = 2
+
+lod_cache = ArrayCache('lods')
+
+# LODs left with more triangles than this times their target are reported
+LOD_TOLERANCE = 1.1
+
+# Settings that change the welded vertices, and so the cached triangles
+ATTRIBUTE_SETTINGS = ('gltf_yup', 'gltf_normals', 'gltf_tangents', 'gltf_texcoords', 'gltf_colors')
+
+def lod_settings(export_settings) -> dict:
+    '''Mesh settings for LODs from the glTF add-on's export settings, or the fast path's'''
+    return {
+        'gltf_apply': export_settings.get('gltf_apply', True),
+        'gltf_yup': export_settings.get('gltf_yup', True),
+        'gltf_normals': export_settings.get('gltf_normals', True),
+        'gltf_tangents': export_settings.get('gltf_tangents', False),
+        'gltf_texcoords': export_settings.get('gltf_texcoords', True),
+        'gltf_colors': export_settings.get('gltf_colors', export_settings.get('gltf_all_vertex_colors', False)),
+    }
+
+def position_groups(welded: WeldedMesh) -> np.ndarray:
+    '''Id of each vertex's position, shared by the copies of a vertex along UV and normal seams'''
+    return np.unique(welded.attributes['POSITION'], axis=0, return_inverse=True)[1].ravel()
+
+def locked_vertices(welded: WeldedMesh) -> np.ndarray:
+    '''Vertices that border another material. Keeping them in place stops LODs cracking open'''
+    positions = welded.attributes['POSITION']
+    corners = welded.triangles.ravel()
+    materials = np.repeat(welded.materials, 3)
+    low = np.full(len(positions), np.iinfo(np.int32).max, dtype=np.int32)
+    high = np.full(len(positions), -1, dtype=np.int32)
+    np.minimum.at(low, corners, materials)
+    np.maximum.at(high, corners, materials)
+    return low != high
+
+def object_lods(objects, depsgraph: Depsgraph, settings, ratios) -> tuple[dict, list[str]]:
+    '''
+    Decimated copies of each object's mesh in object space, as
+    {name: [primitives, ...]} with a list of primitives for each ratio of
+    triangles to keep (largest first). Primitive materials are names.
+    Uncached meshes are decimated in parallel worker processes.
+    Also returns issues for LODs that couldn't get close to their target.
+    '''
+    flags = ''.join('1' if settings[key] else '0' for key in ATTRIBUTE_SETTINGS)
+    ratio_key = '-'.join(f'{ratio:g}' for ratio in ratios)
+    meshes, chains, jobs, issues = {}, {}, {}, []
+    for obj in objects:
+        source = obj.evaluated_get(depsgraph) if settings['gltf_apply'] else obj
+        mesh = source.to_mesh()
+        try:
+            key = f'{LOD_VERSION}-{flags}-{ratio_key}-{mesh_digest(mesh)}'
+            welded = WeldedMesh(mesh, settings)
+        finally:
+            source.to_mesh_clear()
+        if not len(welded.triangles):
+            continue
+        targets = [max(int(len(welded.triangles) * ratio), 1) for ratio in ratios]
+        meshes[obj.name] = (obj, welded, targets)
+
+        cached = lod_cache.get(key)
+        if cached is not None:
+            chains[obj.name] = unpack_lods(cached)
+            continue
+        jobs[obj.name] = (key, (
+            welded.attributes['POSITION'], welded.triangles, locked_vertices(welded), targets, position_groups(welded)
+        ))
+
+    if jobs:
+        results = parallel_map('geometry.decimate.lod_chain', [job for _, job in jobs.values()])
+        for (name, (key, _)), chain in zip(jobs.items(), results):
+            lod_cache.put(key, **pack_lods(chain))
+            chains[name] = chain
+
+    for name, (obj, welded, targets) in meshes.items():
+        for level, ((triangles, _), target) in enumerate(zip(chains[name], targets), start=1):
+            if len(triangles) > target * LOD_TOLERANCE:
+                issues.append(f"LOD {level} of '{name}' stopped at {len(triangles)} triangles, the target was {target}")
+
+    lods = {
+        name: [welded.primitives(obj, triangles.astype(np.int64), faces) for triangles, faces in chains[name]]
+        for name, (obj, welded, _) in meshes.items()
+    }
+    return lods, issues
+
+def pack_lods(chain) -> dict:
+    '''Concatenate a chain of LODs into flat arrays for the cache'''
+    return {
+        'triangles': np.concatenate([t for t, _ in chain]),
+        'faces': np.concatenate([f for _, f in chain]),
+        'counts': np.array([len(t) for t, _ in chain], dtype=np.int64),
+    }
+
+def unpack_lods(arrays) -> list:
+    splits = np.cumsum(arrays['counts'])[:-1]
+    return list(zip(np.split(arrays['triangles'], splits), np.split(arrays['faces'], splits)))
@@ -0,0 +1,122 @@
+import numpy as np
+from contextlib import contextmanager
+from bpy.types import Depsgraph, Mesh, Object
+from . import gltf_builder
+from ..geometry.limits import weld
+
+def foreach_array(seq, attr, size, dtype=np.float32):
+    '''Read an attribute of every item in a bpy collection into a flat array'''
+    arr = np.empty(len(seq) * size, dtype=dtype)
+    if len(arr):
+        seq.foreach_get(attr, arr)
+    return arr
+
+@contextmanager
+def evaluated_mesh(obj: Object, depsgraph: Depsgraph):
+    '''Temporary mesh with modifiers applied, freed on exit'''
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    try:
+        yield mesh
+    finally:
+        obj_eval.to_mesh_clear()
+
+def mesh_triangles(mesh: Mesh):
+    '''Vertex positions (N, 3) and triangle indices (M, 3) in object space'''
+    mesh.calc_loop_triangles()
+    positions = foreach_array(mesh.vertices, 'co', 3).reshape(-1, 3)
+    triangles = foreach_array(mesh.loop_triangles, 'vertices', 3, np.int32).reshape(-1, 3)
+    return positions, triangles
+
+def to_gltf_space(positions: np.ndarray, export_settings):
+    '''Convert Blender Z-up coordinates the same way the glTF exporter does'''
+    if not export_settings.get('gltf_yup', True):
+        return positions
+    return positions[:, [0, 2, 1]] * np.array([1, 1, -1], dtype=positions.dtype)
+
+def corner_attributes(mesh: Mesh, settings) -> dict:
+    '''glTF vertex attributes for every face corner, before welding'''
+    corner_verts = foreach_array(mesh.loops, 'vertex_index', 1, np.int32)
+    positions = foreach_array(mesh.vertices, 'co', 3).reshape(-1, 3)
+    attributes = {'POSITION': to_gltf_space(positions[corner_verts], settings)}
+
+    if settings['gltf_normals']:
+        normals = foreach_array(mesh.corner_normals, 'vector', 3).reshape(-1, 3)
+        attributes['NORMAL'] = to_gltf_space(normals, settings)
+
+    if settings['gltf_texcoords']:
+        for i, layer in enumerate(mesh.uv_layers):
+            uv = foreach_array(layer.data, 'uv', 2).reshape(-1, 2)
+            uv[:, 1] = 1 - uv[:, 1]     # glTF has V pointing down
+            attributes[f'TEXCOORD_{i}'] = uv
+
+    if settings['gltf_tangents'] and mesh.uv_layers:
+        mesh.calc_tangents()
+        tangents = np.empty((len(mesh.loops), 4), dtype=np.float32)
+        tangents[:, :3] = to_gltf_space(foreach_array(mesh.loops, 'tangent', 3).reshape(-1, 3), settings)
+        tangents[:, 3] = foreach_array(mesh.loops, 'bitangent_sign', 1)
+        attributes['TANGENT'] = tangents
+
+    if settings['gltf_colors']:
+        for i, colors in enumerate(mesh.color_attributes):
+            if colors.domain == 'CORNER':
+                attributes[f'COLOR_{i}'] = foreach_array(colors.data, 'color', 4).reshape(-1, 4)
+            elif colors.domain == 'POINT':
+                attributes[f'COLOR_{i}'] = foreach_array(colors.data, 'color', 4).reshape(-1, 4)[corner_verts]
+
+    return attributes
+
+class WeldedMesh:
+    '''
+    glTF vertex attributes of a mesh with duplicate corners merged, and its
+    triangles with their material indices. Shared by the fast path and LODs.
+    '''
+
+    def __init__(self, mesh: Mesh, settings):
+        mesh.calc_loop_triangles()
+        corners = foreach_array(mesh.loop_triangles, 'loops', 3, np.int32).reshape(-1, 3)
+        self.materials = foreach_array(mesh.loop_triangles, 'material_index', 1, np.int32)
+        self.color_names = [c.name for c in mesh.color_attributes] if settings['gltf_colors'] else []
+        if len(corners):
+            self.attributes, self.triangles = weld(corner_attributes(mesh, settings), corners)
+        else:
+            self.attributes, self.triangles = {}, corners
+
+    def primitives(self, obj: Object, triangles=None, faces=None) -> list:
+        '''
+        One primitive per material, each with its own vertices. triangles can
+        replace the mesh's own, with faces giving the original triangle of each.
+        Materials are set by name.
+        '''
+        if triangles is None:
+            triangles, materials = self.triangles, self.materials
+        else:
+            materials = self.materials[faces]
+
+        primitives = []
+        for material_index in np.unique(materials):
+            used, local = np.unique(triangles[materials == material_index], return_inverse=True)
+            prim = gltf_builder.make_primitive(self.attributes['POSITION'][used], local.reshape(-1, 3), {
+                name: self.make_attribute(name, array[used])
+                for name, array in self.attributes.items() if name != 'POSITION'
+            })
+            slot = obj.material_slots[material_index] if material_index < len(obj.material_slots) else None
+            prim.material = slot.material.name if slot is not None and slot.material else None
+            primitives.append(prim)
+        return primitives
+
+    def make_attribute(self, name, array):
+        from io_scene_gltf2.io.com.gltf2_io_constants import ComponentType, DataType, BufferViewTarget
+
+        data_type = {2: DataType.Vec2, 3: DataType.Vec3, 4: DataType.Vec4}[array.shape[1]]
+        accessor = gltf_builder.make_accessor(
+            np.ascontiguousarray(array, dtype=np.float32),
+            data_type, ComponentType.Float, BufferViewTarget.ARRAY_BUFFER
+        )
+        if name.startswith('COLOR_'):
+            accessor.name = self.color_names[int(name[len('COLOR_'):])]
+        return accessor
+
+def mesh_primitives(mesh: Mesh, obj: Object, settings) -> list:
+    '''One primitive per material, each with its own welded vertices'''
+    return WeldedMesh(mesh, settings).primitives(obj)
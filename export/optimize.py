@@ -0,0 +1,23 @@
+from . import gltf_builder
+from ..geometry.vertexcache import acmr, tipsify, sort_clusters, optimize_fetch
+
+def optimize_primitive(prim, cache_size) -> tuple[float, float]:
+    '''
+    Reorder the triangles of a triangle list primitive for the vertex cache and
+    overdraw, then its vertices for fetch locality. Unused vertices are dropped.
+    Returns the ACMR before and after.
+    '''
+    positions = gltf_builder.read_accessor(prim.attributes['POSITION'])
+    indices = gltf_builder.read_accessor(prim.indices).reshape(-1, 3)
+    before = acmr(indices, cache_size)
+
+    triangles, clusters = tipsify(indices, len(positions), cache_size)
+    triangles = sort_clusters(triangles, clusters, positions)
+    used, triangles = optimize_fetch(triangles, len(positions))
+
+    prim.attributes = {
+        name: gltf_builder.copy_accessor(accessor, gltf_builder.read_accessor(accessor)[used])
+        for name, accessor in prim.attributes.items()
+    }
+    prim.indices = gltf_builder.make_indices(triangles)
+    return before, acmr(triangles, cache_size)
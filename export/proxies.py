@@ -0,0 +1,117 @@
+import bpy
+from contextlib import contextmanager
+from bpy.app.handlers import persistent
+from bpy.types import Collection, Depsgraph, Mesh, Object
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .analysis import WorldMeshes
+
+class ProxyCache:
+    '''
+    World space geometry of custom collision collections. Inside scope() each
+    collection is evaluated once and shared by every model that uses it, until
+    one of its objects or meshes changes. Batch exports put models that share a
+    collection in the same worker so they share it too.
+    '''
+
+    def __init__(self):
+        self.meshes: dict[str, 'WorldMeshes'] = {}
+        self.users: dict[tuple[str, str], set[str]] = {}    # (ID type, name) -> cached collections it is part of
+        self.depth = 0
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def scope(self):
+        '''Keep collections for the exports inside, like a batch of models, and forget them after'''
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if self.depth == 0:
+                self.invalidate()
+
+    def get(self, collection: Collection, depsgraph: Depsgraph) -> 'WorldMeshes':
+        from .analysis import WorldMeshes    # This module loads at startup for its handlers
+        meshes = self.meshes.get(collection.name)
+        if meshes is not None:
+            self.hits += 1
+            return meshes
+        self.misses += 1
+        meshes = WorldMeshes(collection.all_objects, depsgraph)
+        if not self.depth:
+            return meshes   # Nothing would forget it
+
+        # Reverse map so an update only has to look up the ID it is for
+        self.meshes[collection.name] = meshes
+        objects = collection.all_objects
+        for id in (collection, *collection.children_recursive, *objects, *(o.data for o in objects if o.data)):
+            self.users.setdefault(id_key(id), set()).add(collection.name)
+        return meshes
+
+    def invalidate(self, names=None):
+        '''Forget the named collections, or all of them'''
+        if names is None:
+            self.meshes.clear()
+            self.users.clear()
+            return
+        names = set(names)
+        if not names:
+            return
+        for name in names:
+            self.meshes.pop(name, None)
+        for key in list(self.users):
+            self.users[key] -= names
+            if not self.users[key]:
+                del self.users[key]
+
+    def affected(self, id) -> set[str]:
+        '''Names of the cached collections an updated collection, object or mesh belongs to'''
+        names = set(self.users.get(id_key(id), ()))
+        if isinstance(id, Collection):
+            # Removed collections can't be looked up by name
+            names.update(name for name in self.meshes if bpy.data.collections.get(name) is None)
+        return names
+
+def id_key(id) -> tuple[str, str]:
+    return type(id).__name__, id.name
+
+proxy_cache = ProxyCache()
+
+###############################################################################
+
+@persistent
+def on_depsgraph_update(scene, depsgraph):
+    if not proxy_cache.meshes:
+        return
+    for update in depsgraph.updates:
+        if isinstance(update.id, Collection) or (
+            isinstance(update.id, (Object, Mesh)) and (update.is_updated_geometry or update.is_updated_transform)
+        ):
+            proxy_cache.invalidate(proxy_cache.affected(update.id.original))
+            if not proxy_cache.meshes:
+                return
+
+@persistent
+def on_invalidate(*args):
+    proxy_cache.invalidate()
+
+HANDLERS = (
+    (bpy.app.handlers.depsgraph_update_post, on_depsgraph_update),
+    (bpy.app.handlers.load_post, on_invalidate),
+    (bpy.app.handlers.undo_post, on_invalidate),
+    (bpy.app.handlers.redo_post, on_invalidate),
+)
+
+def register():
+    for handlers, handler in HANDLERS:
+        if handler not in handlers:
+            handlers.append(handler)
+
+def unregister():
+    for handlers, handler in HANDLERS:
+        if handler in handlers:
+            handlers.remove(handler)
+    proxy_cache.invalidate()
@@ -0,0 +1,403 @@
+import bpy
+import numpy as np
+from bpy.types import Collection
+from .. import GLTF_EXTENSION_NAME
+from ..data.scene import CollectionData, ObjectData, FACE_COLLISION_MODES
+from ..data.tag_index import tag_key
+from .meshes import to_gltf_space
+from .collision import object_hull, object_box, has_face_collision, face_collision_parts, face_part_name
+from .analysis import WorldMeshes
+from .limits import split_primitive
+from .optimize import optimize_primitive
+from .lod import object_lods, lod_settings
+from ..geometry.obb import box_corners, BOX_TRIANGLES
+from . import gltf_builder, stages
+
+# Node tags the scene table groups nodes by, the rest are stored per node
+TABLE_KEYS = ('$collision', '$visible', '$lod')
+
+# Issues found by the latest export of each collection, for the export operator to report
+export_issues: dict[str, list[str]] = {}
+
+class ExportSession:
+    '''
+    Sourcery data for the export of a single collection. Tags are read once when
+    the export starts so the per-node hooks only need a dictionary lookup, and
+    the analysis stages in stages.py fill in the rest before any node is gathered.
+    '''
+
+    def __init__(self, export_settings, collection: Collection, stream=False, memory_limit=0):
+        # Only available once the glTF exporter is running
+        from io_scene_gltf2.io.com.gltf2_io_extensions import Extension
+        self.Extension = Extension
+
+        self.export_settings = export_settings
+        self.collection = collection
+        self.stream = stream    # Analyze each object as its node is gathered instead of up front
+        self.memory_limit = memory_limit    # Bytes, 0 for no limit
+        self.data: CollectionData = collection.sourcery_data
+        self.depsgraph = bpy.context.evaluated_depsgraph_get()
+        self.nodes = {}     # object name -> node extension
+        self.snapshot = set()   # Names of the objects whose tags were read up front
+        self.tagged = []    # (glTF node, node extension) for the scene table
+        self.use_table = self.data.tag_format == 'TABLE'
+        self.generate_hulls = self.data.generate_hulls
+        self.fit_boxes = self.data.fit_boxes
+        self.objects = collection.all_objects
+        for obj in self.objects:
+            self.snapshot.add(obj.name)
+            if tag_key(obj) is not None:
+                extension = {}
+                ObjectData.save_to_gltf(obj.sourcery_data, extension)
+                if extension:
+                    self.nodes[obj.name] = extension
+
+        # Filled in by the analysis stages, see stages.analyze
+        self._world = None
+        self.auto = None        # Resolved collision mode of the model
+        self.proxy = None       # World space meshes of a custom collision collection outside the model
+        self.proxy_modes = {}   # proxy object name -> collision mode
+        self.proxy_node = None  # glTF node the proxy meshes were added to
+        self.face_parts = {}    # object name -> parts for each face collision mode
+        self.faces = None       # World space face collision parts
+        self.face_modes = {}    # face collision part name -> collision mode
+        self.face_owners = {}   # face collision part name -> object name
+        self.pieces = {}        # object name -> convex pieces
+        self.lod_levels = []    # Ratio and switch point of each generated LOD
+        self.lods = {}          # object name -> primitives of each LOD
+        self.convex_pieces = 0  # Pieces of the objects analyzed so far, when streaming
+        self.mass_parts = []    # Mass properties of the colliding meshes analyzed so far
+        self.extents = []       # Boxes and bounding sphere of each batch of meshes analyzed so far
+        self.issues = []
+        self.physics = None     # Mass properties of the collision model
+        self.bounds = {}        # Model bounds for the scene extension
+        self.acmr = [0, 0.0, 0.0]   # Triangles optimized, and their vertex cache misses before and after
+
+    def decimate(self, objects) -> dict:
+        '''object name -> primitives of each LOD level, warning about LODs that fell short'''
+        lods, issues = object_lods(
+            objects, self.depsgraph, lod_settings(self.export_settings),
+            [level['ratio'] for level in self.lod_levels]
+        )
+        self.report(issues)
+        return lods
+
+    def face_collision_mode(self, name, number) -> str | None:
+        '''Collision mode of an object's faces, where Auto uses the object's mode, or the model's if it has none'''
+        mode = FACE_COLLISION_MODES.get(number, 'auto')
+        return self.collision_mode(name) if mode == 'auto' else mode
+
+    def is_collider(self, name) -> bool:
+        '''Whether an object of the model is collision as a whole, rather than none or by face'''
+        return name not in self.face_parts and self.collision_mode(name) != 'none'
+
+    def extra_colliders(self) -> list[tuple[WorldMeshes, dict]]:
+        '''World space collision meshes other than the model's objects, with the names of those that collide'''
+        return [
+            (meshes, {name: mode for name, mode in modes.items() if mode != 'none'})
+            for meshes, modes in ((self.proxy, self.proxy_modes), (self.faces, self.face_modes))
+            if meshes is not None
+        ]
+
+    @property
+    def world(self) -> WorldMeshes:
+        '''World space meshes of the model, evaluated once for all analysis stages and freed after them'''
+        if self._world is None:
+            self._world = WorldMeshes(self.objects, self.depsgraph)
+        return self._world
+
+    def report(self, issues):
+        '''Keep issues for the export and print them as warnings'''
+        self.issues += issues
+        for issue in issues:
+            print(f"[Sourcery] Warning: {issue}")
+
+    def object_tags(self, blender_object) -> dict:
+        '''
+        Tags of an object from the snapshot. Objects the exporter reaches
+        some other way, like through collection instances, are read now.
+        '''
+        if blender_object.name in self.snapshot:
+            return self.nodes.get(blender_object.name, {})
+        extension = {}
+        data = getattr(blender_object, 'sourcery_data', None)
+        if data is not None:
+            ObjectData.save_to_gltf(data, extension)
+        return extension
+
+    def object_face_parts(self, blender_object) -> dict | None:
+        '''Face collision parts of an object from the analysis, or read now like object_tags'''
+        if blender_object.name in self.face_parts:
+            return self.face_parts[blender_object.name]
+        if blender_object.name in self.snapshot:
+            return None
+        return face_collision_parts(blender_object, self.depsgraph) if has_face_collision(blender_object) else None
+
+    def collision_mode(self, name) -> str | None:
+        '''Collision mode of an object, falling back to the model's'''
+        mode = self.nodes.get(name, {}).get('$collision')
+        if mode is None:
+            if self.auto is not None:
+                mode = self.auto['collision']
+            elif self.data.collision_mode != 'AUTO':
+                mode = self.data.collision_mode.lower()
+        return mode
+
+    @staticmethod
+    def begin(export_settings, stream=False, memory_limit=0) -> 'ExportSession | None':
+        '''Session for a Sourcery collection export with its analysis done, or None for any other export'''
+        collection_id = export_settings.get('gltf_collection')
+        if not collection_id:
+            return None  # Not a collection export
+
+        collection = bpy.data.collections.get((collection_id, None))
+        if not collection:
+            print(f"[Sourcery] Error: Failed to find collection '{collection_id}'")
+            return None
+        if not getattr(collection, 'sourcery_data', None):
+            print(f"[Sourcery] Error: Collection '{collection_id}' has no Sourcery data")
+            return None
+        session = ExportSession(export_settings, collection, stream, memory_limit)
+        export_issues[collection.name] = session.issues
+        stages.analyze(session)
+        return session
+
+    # Scene
+    ###########################################################################
+
+    def scene_extension(self, gltf2_plan):
+        if self.stream:
+            stages.finish(self)
+        triangles, before, after = self.acmr
+        if triangles:
+            print(f"[Sourcery] Optimized {triangles} triangles: ACMR {before / triangles:.3f} -> {after / triangles:.3f}")
+        extension = {}
+        CollectionData.save_to_gltf(self.data, extension)
+        if self.auto is not None:
+            extension['$collision'] = self.auto['collision']
+            extension['$auto'] = self.auto
+        if self.physics is not None:
+            extension['$mass'] = self.physics['mass']
+            extension['$physics'] = self.physics
+        extension.update(self.bounds)
+        if self.lod_levels:
+            extension['$lods'] = self.lod_levels
+        if self.use_table:
+            extension['$nodes'] = self.tag_table(gltf2_plan)
+        return extension
+
+    def tag_table(self, gltf2_plan):
+        '''
+        Node indices grouped by collision mode, visibility and LOD, and any other
+        tags by node index:
+        {"collision": {"hull": [0, 3], ...}, "invisible": [3], "lod": {"1": [4]},
+         "tags": {"0": {"$mass": 12.5}, ...}}
+        '''
+        # Nodes have been assigned their final indices by now
+        indices = {id(node): i for i, node in enumerate(gltf2_plan.nodes or [])}
+        collision, invisible, lods, tags = {}, [], {}, {}
+        for node, extension in self.tagged:
+            i = indices.get(id(node))
+            if i is None:
+                continue
+            if '$collision' in extension:
+                collision.setdefault(extension['$collision'], []).append(i)
+            if extension.get('$visible') is False:
+                invisible.append(i)
+            if '$lod' in extension:
+                lods.setdefault(str(extension['$lod']), []).append(i)
+            other = {key: value for key, value in extension.items() if key not in TABLE_KEYS}
+            if other:
+                tags[str(i)] = other
+
+        for nodes in (*collision.values(), *lods.values()):
+            nodes.sort()
+        table = {'collision': collision, 'invisible': sorted(invisible)}
+        if lods:
+            table['lod'] = lods
+        if tags:
+            table['tags'] = dict(sorted(tags.items(), key=lambda item: int(item[0])))
+        return table
+
+    # Nodes
+    ###########################################################################
+
+    def gather_node(self, gltf2_node, blender_object):
+        if blender_object is None:
+            return
+        if self.proxy_modes and self.proxy_node is None:
+            self.add_proxy(gltf2_node, blender_object)
+        if self.stream:
+            stages.analyze_object(self, blender_object)
+        if blender_object.name in self.lods:
+            self.add_lods(gltf2_node, blender_object)
+        parts = self.object_face_parts(blender_object)
+        if parts:
+            extension = dict(self.object_tags(blender_object))
+            self.add_face_collision(gltf2_node, blender_object, extension, parts)
+            self.tag(gltf2_node, extension)
+            return
+        extension = dict(self.object_tags(blender_object))
+        if blender_object.name in self.pieces:
+            self.add_pieces(gltf2_node, blender_object, extension)
+            self.tag(gltf2_node, extension)
+            return
+        # Generated like decomposition, for objects that get the model's mode too
+        mode = self.collision_mode(blender_object.name) if blender_object.type == 'MESH' else None
+        if self.generate_hulls and mode == 'hull':
+            self.add_hull(gltf2_node, blender_object, extension)
+        elif self.fit_boxes != 'NONE' and mode == 'box':
+            self.add_box(gltf2_node, blender_object, extension)
+
+        self.tag(gltf2_node, extension)
+
+    def release(self, name):
+        '''Drop the generated geometry of an object once its node has been written'''
+        self.lods.pop(name, None)
+        self.pieces.pop(name, None)
+        self.face_parts.pop(name, None)
+
+    def tag(self, gltf2_node, extension):
+        '''Write tags to a node, or to the scene table'''
+        if not extension:
+            return
+        if self.use_table:
+            self.tagged.append((gltf2_node, extension))
+            return
+        if gltf2_node.extensions is None:
+            gltf2_node.extensions = {}
+        gltf2_node.extensions[GLTF_EXTENSION_NAME] = self.Extension(
+            name=GLTF_EXTENSION_NAME,
+            extension=extension,
+            required=False
+        )
+
+    # Meshes
+    ###########################################################################
+
+    def add_lods(self, gltf2_node, blender_object):
+        '''Add each LOD of an object as a child with the same materials as the node'''
+        materials = {}
+        for prim in gltf2_node.mesh.primitives if gltf2_node.mesh else []:
+            if prim.material is not None:
+                materials[getattr(prim.material, 'name', prim.material)] = prim.material
+
+        for level, primitives in enumerate(self.lods[blender_object.name], start=1):
+            for prim in primitives:
+                prim.material = materials.get(prim.material, prim.material)
+            child = gltf_builder.make_mesh_node(f'{blender_object.name}_lod{level}', primitives)
+            self.gather_mesh(child.mesh)
+            gltf_builder.add_child(gltf2_node, child)
+            self.tag(child, {'$lod': level, '$collision': 'none'})
+
+    def gather_mesh(self, gltf2_mesh):
+        if self.data.split_meshes:
+            self.split_mesh(gltf2_mesh)
+        if self.data.optimize_meshes:
+            self.optimize_mesh(gltf2_mesh)
+
+    def split_mesh(self, gltf2_mesh):
+        '''Split primitives that are over the vertex or triangle limits'''
+        max_vertices, max_triangles = self.data.limit_vertices, self.data.limit_triangles
+
+        primitives = []
+        for prim in gltf2_mesh.primitives:
+            position = prim.attributes.get('POSITION')
+            is_triangles = prim.indices is not None and prim.mode in (None, 4)
+            if not is_triangles or position is None or (
+                position.count <= max_vertices and prim.indices.count // 3 <= max_triangles
+            ):
+                primitives.append(prim)
+                continue
+            primitives.extend(split_primitive(prim, max_vertices, max_triangles))
+        gltf2_mesh.primitives = primitives
+
+    def optimize_mesh(self, gltf2_mesh):
+        '''Reorder triangle list primitives for the vertex cache, adding up the change in ACMR for the log'''
+        for prim in gltf2_mesh.primitives:
+            if prim.indices is None or prim.mode not in (None, 4) or 'POSITION' not in prim.attributes or prim.targets:
+                continue
+            count = prim.indices.count // 3
+            old, new = optimize_primitive(prim, self.data.vertex_cache_size)
+            self.acmr[0] += count
+            self.acmr[1] += old * count
+            self.acmr[2] += new * count
+
+    # Collision
+    ###########################################################################
+
+    def add_collision_node(self, gltf2_node, name, primitives, collision_mode, extra=None):
+        '''Add invisible generated collision geometry as a child of a node'''
+        child = gltf_builder.make_mesh_node(name, primitives)
+        gltf_builder.add_child(gltf2_node, child)
+        tags = {'$collision': collision_mode} if collision_mode is not None else {}
+        self.tag(child, {**tags, '$visible': False, **(extra or {})})
+        return child
+
+    def add_proxy(self, gltf2_node, blender_object):
+        '''Add the custom collision meshes under the first node, moved into its space'''
+        matrix = np.array(blender_object.matrix_world, dtype=np.float64)
+        if abs(np.linalg.det(matrix[:3, :3])) < 1e-12:
+            return  # Try the next node
+        inverse = np.linalg.inv(matrix)
+        for name, mode in self.proxy_modes.items():
+            positions, triangles = self.proxy.mesh(name)
+            local = (positions @ inverse[:3, :3].T + inverse[:3, 3]).astype(np.float32)
+            primitive = gltf_builder.make_primitive(to_gltf_space(local, self.export_settings), triangles)
+            self.add_collision_node(gltf2_node, name, [primitive], mode)
+        self.proxy_node = gltf2_node
+
+    def add_face_collision(self, gltf2_node, blender_object, extension, parts):
+        '''Add a collision child for each face collision mode of an object'''
+        for number, (vertices, triangles) in sorted(parts.items()):
+            mode = self.face_collision_mode(blender_object.name, number)
+            if mode == 'none':
+                continue
+            primitive = gltf_builder.make_primitive(to_gltf_space(vertices, self.export_settings), triangles)
+            self.add_collision_node(gltf2_node, face_part_name(blender_object.name, number), [primitive], mode)
+
+        # The parts replace the object's own collision, it's only rendered
+        extension['$collision'] = 'none'
+
+    def add_hull(self, gltf2_node, blender_object, extension):
+        hull = object_hull(blender_object, self.depsgraph)
+        if hull is None:
+            return
+        vertices, triangles = hull
+        primitive = gltf_builder.make_primitive(to_gltf_space(vertices, self.export_settings), triangles)
+        self.add_collision_node(gltf2_node, f'{blender_object.name}_hull', [primitive], 'hull')
+
+        # The generated hull replaces the object's own collision
+        extension['$collision'] = 'none'
+
+    def add_pieces(self, gltf2_node, blender_object, extension):
+        pieces = self.pieces[blender_object.name]
+        if not pieces:
+            return
+        for i, (vertices, triangles) in enumerate(pieces):
+            primitive = gltf_builder.make_primitive(to_gltf_space(vertices, self.export_settings), triangles)
+            self.add_collision_node(gltf2_node, f'{blender_object.name}_piece{i}', [primitive], 'hull')
+
+        # The convex pieces replace the concave mesh collision
+        extension['$collision'] = 'none'
+
+    def add_box(self, gltf2_node, blender_object, extension):
+        box = object_box(blender_object, self.depsgraph)
+        if box is None:
+            return
+        center, axes, half = box
+
+        if self.fit_boxes == 'MESH':
+            corners = to_gltf_space(box_corners(center, axes, half), self.export_settings)
+            primitive = gltf_builder.make_primitive(corners, BOX_TRIANGLES)
+            self.add_collision_node(gltf2_node, f'{blender_object.name}_box', [primitive], 'box')
+            extension['$collision'] = 'none'
+        else:
+            # Center and rows of axes, converted like the mesh data. Like the mesh data
+            # they're in the node's space and units, not Hammer Units like $bbox
+            gltf_space = to_gltf_space(np.vstack([center, axes]), self.export_settings)
+            extension['$box'] = {
+                'center': gltf_space[0].tolist(),
+                'axes': gltf_space[1:].tolist(),
+                'half_extents': half.tolist(),
+            }
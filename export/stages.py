@@ -0,0 +1,327 @@
+import numpy as np
+from typing import TYPE_CHECKING
+from ..data.scene import METERS_PER_HAMMER_UNIT
+from ..data.prefs import SourcePreferences
+from ..game.keyvalues import KeyValuesError
+from ..game.materials import resolver
+from .meshes import to_gltf_space
+from .collision import decompose_objects, has_face_collision, face_collision_parts, face_part_name
+from .analysis import WorldMeshes, world_space
+from .limits import check_objects
+from .proxies import proxy_cache
+from ..geometry.analysis import MeshStats, resolve_auto, bounding_box, bounding_sphere, merge_boxes, merge_spheres
+from ..geometry.mass import MassProperties
+from ..util.profiling import check_memory
+from ..util.workers import worker_pool
+
+if TYPE_CHECKING:
+    from .session import ExportSession
+
+# Analysis stages of an export, run in order once its tags are read. Each one
+# reads and fills in the session's state before any node is gathered. When
+# streaming, the stages that keep geometry of every object run per object
+# instead as its node is gathered, see analyze_object.
+
+def analyze(session: 'ExportSession'):
+    data = session.data
+    check_memory(session.memory_limit, 'reading the tags')
+    if data.collision is not None:
+        use_custom_collision(session)
+    if data.resolve_auto and data.collision_mode == 'AUTO':
+        resolve_auto_collision(session)
+    if not session.stream:
+        split_face_collision(session)
+    # Decomposition and LODs start their worker processes once between them
+    with worker_pool():
+        if data.decompose and not session.stream:
+            decompose(session)
+        if data.generate_lods and len(data.lods):
+            generate_lods(session)
+    validate(session)
+    if data.compute_mass:
+        compute_mass(session)
+    if data.compute_bounds:
+        compute_bounds(session)
+    if not session.stream:
+        finish(session)
+
+    # Only the stages need the world space copies of the model
+    session._world = None
+    session.faces = None
+    check_memory(session.memory_limit, 'the analysis')
+
+def analyze_object(session: 'ExportSession', obj):
+    '''
+    The stages for one object of a streamed export, run as its node is gathered.
+    Its LODs, face collision parts and convex pieces are only kept until the
+    node is written, its mass and bounds are added up for finish.
+    '''
+    if obj.type != 'MESH' or obj.name not in session.snapshot:
+        return
+    data = session.data
+    if session.lod_levels and session.object_tags(obj).get('$visible', True):
+        session.lods.update(session.decimate([obj]))
+    faces = WorldMeshes.from_meshes(add_face_parts(session, obj))
+    if data.decompose and obj.name not in session.face_parts and session.collision_mode(obj.name) == 'mesh':
+        session.pieces.update(decompose_objects(
+            [obj], session.depsgraph, data.decompose_pieces, data.decompose_vertices, data.decompose_resolution
+        ))
+    session.convex_pieces += count_pieces(session, [obj])
+
+    if not (data.compute_mass or data.compute_bounds):
+        return
+    world = WorldMeshes([obj], session.depsgraph)
+    colliders = [n for n in world.names if session.is_collider(n)]
+    face_colliders = {n: session.face_modes[n] for n in faces.names if session.face_modes[n] != 'none'}
+    if data.compute_mass:
+        add_mass(session, world, colliders, {n: n for n in world.names})
+        add_mass(session, faces, face_colliders, session.face_owners)
+    if data.compute_bounds:
+        add_bounds(session, world, [(faces, face_colliders)])
+
+def finish(session: 'ExportSession'):
+    '''Totals of the model from what the stages added up, once every object has been analyzed'''
+    if session.stream:
+        check_pieces(session, session.convex_pieces)
+
+    if session.mass_parts:
+        density = session.data.get_density()
+        total = MassProperties.concatenate(session.mass_parts).total()
+        # Axes permuted like positions, so the tensor is converted the same way
+        axes = to_gltf_space(np.eye(3), session.export_settings)
+        session.physics = {
+            'mass': float(total.volume[0] * density),
+            'volume': float(total.volume[0]),
+            'density': density,
+            'center_of_mass': to_gltf_space(total.center / METERS_PER_HAMMER_UNIT, session.export_settings)[0].tolist(),
+            'inertia': (axes.T @ total.inertia(density)[0] @ axes).tolist(),
+        }
+
+    if session.extents:
+        bboxes, cboxes, spheres = zip(*session.extents)
+        for key, boxes in (('$bbox', bboxes), ('$cbox', cboxes)):
+            box = merge_boxes(boxes)
+            if box is not None:
+                session.bounds[key] = [box[0].tolist(), box[1].tolist()]
+        sphere = merge_spheres(spheres)
+        if sphere is not None:
+            session.bounds['$sphere'] = {'center': sphere[0].tolist(), 'radius': sphere[1]}
+
+def use_custom_collision(session: 'ExportSession'):
+    '''
+    Make the custom collision collection the collision model. The model's own
+    objects become render only unless they have a collision tag. If the
+    collection is part of the model its objects are just tagged, otherwise
+    its meshes are added to the export from the shared proxy cache.
+    '''
+    objects = session.objects
+    collision = session.data.collision
+    default = session.data.collision_mode.lower() if session.data.collision_mode not in ('AUTO', 'NONE') else 'mesh'
+    modes = {}
+    for obj in collision.all_objects:
+        if obj.type == 'MESH':
+            mode = obj.sourcery_data.collision_mode
+            modes[obj.name] = mode.lower() if mode != 'AUTO' else default
+
+    names = {obj.name for obj in objects}
+    for obj in objects:
+        if obj.type != 'MESH':
+            continue
+        extension = session.nodes.setdefault(obj.name, {})
+        if obj.name in modes:
+            extension.update({'$collision': modes[obj.name], '$visible': False})
+        else:
+            extension.setdefault('$collision', 'none')
+
+    external = {name: mode for name, mode in modes.items() if name not in names and mode != 'none'}
+    if external:
+        session.proxy = proxy_cache.get(collision, session.depsgraph)
+        session.proxy_modes = {name: mode for name, mode in external.items() if name in session.proxy.index}
+
+def resolve_auto_collision(session: 'ExportSession'):
+    '''Pick collision modes for the model and its Auto objects from their size in Hammer Units'''
+    data = session.data
+    names, stats = [], []
+    for world in world_batches(session):
+        names += world.names
+        stats.append(world.stats(data.get_scale()))
+    if not names:
+        return
+    stats = MeshStats.concatenate(stats)
+    thresholds = (data.auto_box_fill, data.auto_hull_size, data.auto_mesh_triangles)
+
+    total = stats.total()
+    modes, reasons = resolve_auto(total, *thresholds)
+    session.auto = {
+        'collision': modes[0],
+        'reason': reasons[0],
+        'size': total.size[0].tolist(),
+        'volume': float(total.volume[0]),
+        'triangles': int(total.triangles[0]),
+    }
+
+    modes, reasons = resolve_auto(stats, *thresholds)
+    for name, mode, reason in zip(names, modes, reasons):
+        extension = session.nodes.setdefault(name, {})
+        if '$collision' not in extension:
+            extension['$collision'] = mode
+            extension['$auto'] = {'collision': mode, 'reason': reason}
+
+def world_batches(session: 'ExportSession'):
+    '''The model's world space meshes, all at once or one object at a time when streaming'''
+    if not session.stream:
+        yield session.world
+        return
+    for obj in session.objects:
+        if obj.type == 'MESH':
+            yield WorldMeshes([obj], session.depsgraph)
+
+def split_face_collision(session: 'ExportSession'):
+    '''Split objects with face collision modes into a part per mode, replacing the object's own collision'''
+    meshes = []
+    for obj in session.objects:
+        meshes += add_face_parts(session, obj)
+    if meshes:
+        session.faces = WorldMeshes.from_meshes(meshes)
+
+def add_face_parts(session: 'ExportSession', obj) -> list:
+    '''Face collision parts of one object, returned as (name, world positions, triangles)'''
+    if not has_face_collision(obj):
+        return []
+    parts = face_collision_parts(obj, session.depsgraph)
+    if not parts:
+        return []
+    session.face_parts[obj.name] = parts
+    meshes = []
+    for number, (vertices, triangles) in parts.items():
+        name = face_part_name(obj.name, number)
+        session.face_modes[name] = session.face_collision_mode(obj.name, number)
+        session.face_owners[name] = obj.name
+        meshes.append((name, world_space(vertices, obj.matrix_world), triangles))
+    return meshes
+
+def decompose(session: 'ExportSession'):
+    '''Convex pieces of the objects with mesh collision'''
+    meshes = [
+        o for o in session.objects
+        if o.type == 'MESH' and o.name not in session.face_parts and session.collision_mode(o.name) == 'mesh'
+    ]
+    data = session.data
+    session.pieces = decompose_objects(
+        meshes, session.depsgraph, data.decompose_pieces, data.decompose_vertices, data.decompose_resolution
+    )
+
+def generate_lods(session: 'ExportSession'):
+    '''Decimated meshes of the visible objects for each LOD, most detailed first'''
+    objects = session.objects
+    levels = sorted(session.data.lods, key=lambda level: level.ratio, reverse=True)
+    session.lod_levels = [{'ratio': level.ratio, 'switch': level.switch_point} for level in levels]
+    if session.stream:
+        return  # Decimated one object at a time as nodes are gathered
+    session.lods = session.decimate([o for o in objects if o.type == 'MESH' and session.object_tags(o).get('$visible', True)])
+
+def validate(session: 'ExportSession'):
+    '''Check the model against the compiler's limits before anything is exported'''
+    objects = session.objects
+    data = session.data
+    suffix = ', it will be split' if data.split_meshes else ''
+    issues = [issue + suffix for issue in check_objects(objects, session.depsgraph, data.get_limits())]
+
+    issues += check_materials(session)
+    session.report(issues)
+    # Known once every object has been analyzed when streaming
+    if not session.stream:
+        check_pieces(session, count_pieces(session, objects))
+
+def count_pieces(session: 'ExportSession', objects) -> int:
+    '''Generated pieces, plus one for each object or face collision part the compiler makes a single hull or box for'''
+    pieces = 0
+    for o in objects:
+        if o.type != 'MESH':
+            continue
+        if o.name in session.pieces:
+            pieces += len(session.pieces[o.name])
+        elif o.name in session.face_parts:
+            pieces += sum(
+                1 for number in session.face_parts[o.name]
+                if session.face_collision_mode(o.name, number) in ('hull', 'box')
+            )
+        elif session.collision_mode(o.name) in ('hull', 'box'):
+            pieces += 1
+    return pieces
+
+def check_pieces(session: 'ExportSession', pieces):
+    '''Check the collision model's convex pieces, with those of the custom collision, against the limit'''
+    pieces += sum(1 for mode in session.proxy_modes.values() if mode in ('hull', 'box'))
+    limit = session.data.limit_convex_pieces
+    if pieces > limit:
+        session.report([f'Collision model has {pieces} convex pieces, over the limit of {limit}'])
+
+def check_materials(session: 'ExportSession') -> list[str]:
+    '''Find materials that have no VMT in any $cdmaterials folder of the active game'''
+    objects = session.objects
+    game = SourcePreferences.get().get_game()
+    if game is None:
+        return []
+    names = {
+        slot.material.name
+        for obj in objects if obj.type == 'MESH'
+        for slot in obj.material_slots if slot.material
+    }
+    cdmaterials = [m.path for m in session.data.cdmaterials]
+    try:
+        missing = resolver.missing(game.get_filesystem(), cdmaterials, names)
+    except (OSError, KeyValuesError) as e:
+        return [f"Can't check materials against {game.name}: {e}"]
+    folders = ', '.join(f"'{path}'" for path in cdmaterials) or 'materials'
+    return [f"Material '{name}' not found in {game.name} under {folders}" for name in missing]
+
+def compute_mass(session: 'ExportSession'):
+    '''
+    Mass, center of mass and inertia of the collision model from its surfaceprop
+    density, at the size the model is compiled at. Mass is in kg, volume in m³,
+    inertia in kg·m² and the center in Hammer Units like the bounds. When
+    streaming only the custom collision is added here, see analyze_object.
+    '''
+    if not session.stream:
+        world = session.world
+        add_mass(session, world, [n for n in world.names if session.is_collider(n)], {n: n for n in world.names})
+    for meshes, modes in session.extra_colliders():
+        add_mass(session, meshes, modes, session.face_owners if meshes is session.faces else {})
+
+def add_mass(session: 'ExportSession', meshes: WorldMeshes, colliders, owners: dict):
+    '''
+    Mass properties of the colliding meshes for the model's total. Each one's
+    mass is added to the node of its owner in owners, if it has one.
+    '''
+    mask = meshes.mesh_mask(colliders)
+    if not mask.any():
+        return
+    meters = session.data.get_scale() * METERS_PER_HAMMER_UNIT     # Physics meters per Blender meter
+    props = meshes.mass().select(mask).scaled(meters)
+    session.mass_parts.append(props)
+
+    density = session.data.get_density()
+    for name, volume in zip(np.array(meshes.names)[mask], props.volume):
+        if name in owners:
+            extension = session.nodes.setdefault(owners[name], {})
+            extension['$mass'] = extension.get('$mass', 0.0) + float(volume * density)
+
+def compute_bounds(session: 'ExportSession'):
+    '''Render and collision boxes and a bounding sphere in Hammer Units, from one pass over the vertices'''
+    # Only the custom collision when streaming, see analyze_object
+    world = WorldMeshes.from_meshes([]) if session.stream else session.world
+    add_bounds(session, world, session.extra_colliders())
+
+def add_bounds(session: 'ExportSession', world: WorldMeshes, extra_colliders):
+    '''Boxes and bounding sphere of the model's meshes in world and the colliding ones in extra_colliders'''
+    scale = session.data.get_scale()
+    points = to_gltf_space(world.positions * scale, session.export_settings)
+    visible = world.vertex_mask(n for n in world.names if session.nodes.get(n, {}).get('$visible', True))
+    colliders = world.vertex_mask(n for n in world.names if session.is_collider(n))
+    collision_points = [points[colliders]]
+    for meshes, modes in extra_colliders:
+        extra = meshes.positions[meshes.vertex_mask(modes)]
+        collision_points.append(to_gltf_space(extra * scale, session.export_settings))
+    collision_points = np.concatenate(collision_points)
+    session.extents.append((bounding_box(points[visible]), bounding_box(collision_points), bounding_sphere(points[visible])))
@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import hashlib
+from . import gameinfo
+from .vpk import VPK, VPKError
+from ..util.cache import cache_dir
+
+# Bump when the saved index layout changes
+INDEX_VERSION = 2
+
+# Only these top level folders are indexed
+INDEXED_FOLDERS = ('materials', 'models', 'scripts')
+
+# Seconds between checks of the disk for changes
+CHECK_INTERVAL = 2.0
+
+def normalize(path: str) -> str:
+    '''Game paths are case insensitive and use forward slashes'''
+    return '/'.join(part for part in path.replace('\\', '/').lower().split('/') if part)
+
+def mtime(path) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+class LooseRoot:
+    '''
+    Loose files under one search path. A folder's mtime changes when entries
+    are added, removed or renamed in it, so comparing the mtimes of every
+    indexed folder is enough to tell if the listing is still current.
+    '''
+    kind = 'dir'
+
+    def __init__(self, path, dirs=None, files=None):
+        self.path = path
+        self.dirs: dict[str, int | None] = dirs or {}   # relative folder -> mtime
+        self.files: list[str] = files or []             # relative file paths
+
+    def walk(self):
+        self.dirs, self.files = {}, []
+        for folder in INDEXED_FOLDERS:
+            top = os.path.join(self.path, folder)
+            self.dirs[folder] = mtime(top)
+            if self.dirs[folder] is None:
+                continue
+            for dirpath, dirnames, filenames in os.walk(top):
+                rel = os.path.relpath(dirpath, self.path).replace(os.sep, '/')
+                self.dirs[rel] = mtime(dirpath)
+                self.files.extend(f'{rel}/{name}' for name in filenames)
+        return self
+
+    def is_current(self) -> bool:
+        return all(mtime(os.path.join(self.path, rel)) == t for rel, t in self.dirs.items())
+
+    def full_path(self, rel) -> str:
+        return os.path.join(self.path, rel)
+
+    def read(self, rel) -> bytes:
+        with open(self.full_path(rel), 'rb') as f:
+            return f.read()
+
+    def close(self):
+        pass
+
+    def to_json(self):
+        return {'kind': self.kind, 'path': self.path, 'dirs': self.dirs, 'files': self.files}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['path'], data['dirs'], data['files'])
+
+class VPKRoot:
+    '''Files packed in a VPK, opened on the first read'''
+    kind = 'vpk'
+
+    def __init__(self, path, mtime=None, files=None):
+        self.path = path
+        self.mtime = mtime
+        self.files: list[str] = files or []
+        self.vpk: VPK | None = None
+
+    def open(self) -> VPK:
+        if self.vpk is None:
+            self.vpk = VPK(self.path)
+        return self.vpk
+
+    def walk(self):
+        self.mtime = mtime(self.path)
+        try:
+            entries = self.open().entries
+        except (OSError, VPKError) as e:
+            print(f"[Sourcery] Warning: Failed to read '{self.path}': {e}")
+            entries = {}
+        self.files = [p for p in entries if p.partition('/')[0] in INDEXED_FOLDERS]
+        return self
+
+    def is_current(self) -> bool:
+        return mtime(self.path) == self.mtime
+
+    def read(self, rel) -> memoryview | bytes | None:
+        return self.open().read(rel)
+
+    def close(self):
+        '''Unmap the VPK's archives so the game can update them'''
+        if self.vpk is not None:
+            self.vpk.close()
+            self.vpk = None
+
+    def to_json(self):
+        return {'kind': self.kind, 'path': self.path, 'mtime': self.mtime, 'files': self.files}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['path'], data['mtime'], data['files'])
+
+ROOT_TYPES = {LooseRoot.kind: LooseRoot, VPKRoot.kind: VPKRoot}
+
+###############################################################################
+
+class GameFileSystem:
+    '''
+    Index of the materials, models and scripts of a game across its search
+    paths, so lookups are a dictionary access instead of a directory walk.
+    The index is saved to disk and only the search paths that changed are
+    walked again.
+    '''
+
+    def __init__(self, gamedir):
+        self.gamedir = os.path.normpath(os.path.abspath(gamedir))
+        self.roots: list[LooseRoot | VPKRoot] = []
+        self.files: dict[str, tuple[int, str]] = {}     # normalized path -> (root, relative path)
+        self.gameinfo_mtime = None
+        self.loaded = False
+        self.checked = 0.0
+        self.generation = 0     # Incremented whenever the index changes
+
+    @property
+    def index_file(self):
+        digest = hashlib.sha1(os.path.normcase(self.gamedir).encode()).hexdigest()[:16]
+        return cache_dir('games') / f'{digest}.json'
+
+    def ensure(self):
+        '''Bring the index up to date, checking the disk at most every CHECK_INTERVAL seconds'''
+        now = time.monotonic()
+        if self.loaded and now - self.checked < CHECK_INTERVAL:
+            return self
+        self.checked = now
+
+        gameinfo_mtime = mtime(gameinfo.gameinfo_path(self.gamedir))
+        if gameinfo_mtime is None:
+            raise FileNotFoundError(f"No {gameinfo.GAMEINFO} in '{self.gamedir}'")
+
+        if not self.loaded and not self.load():
+            self.rebuild(gameinfo_mtime, {})
+        elif gameinfo_mtime != self.gameinfo_mtime or not all(root.is_current() for root in self.roots):
+            self.rebuild(gameinfo_mtime, {(r.kind, r.path): r for r in self.roots})
+        return self
+
+    def rebuild(self, gameinfo_mtime, previous: dict):
+        '''Index the current search paths, reusing unchanged roots'''
+        roots = []
+        for kind, path in gameinfo.search_paths(self.gamedir):
+            root = previous.get((kind, path))
+            if root is None or not root.is_current():
+                root = ROOT_TYPES[kind](path).walk()
+            roots.append(root)
+
+        for root in set(previous.values()).difference(roots):
+            root.close()
+        self.roots = roots
+        self.gameinfo_mtime = gameinfo_mtime
+        self.loaded = True
+        self.merge()
+        self.save()
+
+    def merge(self):
+        # Earlier search paths take priority
+        self.generation += 1
+        self.files = {}
+        for i, root in reversed(list(enumerate(self.roots))):
+            for rel in root.files:
+                self.files[normalize(rel)] = (i, rel)
+
+    def load(self) -> bool:
+        try:
+            with open(self.index_file, encoding='utf-8') as f:
+                data = json.load(f)
+            if data['version'] != INDEX_VERSION or data['gamedir'] != self.gamedir:
+                return False
+            roots = [ROOT_TYPES[r['kind']].from_json(r) for r in data['roots']]
+        except (OSError, ValueError, KeyError):
+            return False
+
+        self.roots = roots
+        self.gameinfo_mtime = data['gameinfo_mtime']
+        self.loaded = True
+        self.merge()
+        return True
+
+    def save(self):
+        data = {
+            'version': INDEX_VERSION,
+            'gamedir': self.gamedir,
+            'gameinfo_mtime': self.gameinfo_mtime,
+            'roots': [root.to_json() for root in self.roots],
+        }
+        path = self.index_file
+        tmp = path.with_name(path.name + f'.{os.getpid()}.tmp')
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[Sourcery] Warning: Failed to save game index '{path}': {e}")
+
+    def close(self):
+        '''Release open VPKs, they're opened again on the next read'''
+        for root in self.roots:
+            root.close()
+
+    # Lookups
+    ###########################################################################
+
+    def exists(self, path: str) -> bool:
+        return normalize(path) in self.ensure().files
+
+    def find(self, path: str) -> str | None:
+        '''Path on disk of a loose game file, or None if it's missing or packed'''
+        entry = self.ensure().files.get(normalize(path))
+        if entry is None:
+            return None
+        root = self.roots[entry[0]]
+        return root.full_path(entry[1]) if root.kind == LooseRoot.kind else None
+
+    def mtime(self, path: str) -> int | None:
+        '''Modification time of a loose file, or of the VPK a packed file is in'''
+        entry = self.ensure().files.get(normalize(path))
+        if entry is None:
+            return None
+        root = self.roots[entry[0]]
+        return mtime(root.full_path(entry[1])) if root.kind == LooseRoot.kind else root.mtime
+
+    def read(self, path: str) -> memoryview | bytes | None:
+        '''Contents of a game file, zero-copy for most packed files'''
+        entry = self.ensure().files.get(normalize(path))
+        if entry is None:
+            return None
+        return self.roots[entry[0]].read(entry[1])
+
+###############################################################################
+
+filesystems: dict[str, GameFileSystem] = {}
+
+def get_filesystem(gamedir) -> GameFileSystem:
+    '''Shared index for a game folder'''
+    key = os.path.normcase(os.path.normpath(os.path.abspath(gamedir)))
+    if key not in filesystems:
+        filesystems[key] = GameFileSystem(gamedir)
+    return filesystems[key]
+
+def close_filesystems(keep=()):
+    '''Drop the indexes of game folders other than keep, closing their VPKs'''
+    keep = {os.path.normcase(os.path.normpath(os.path.abspath(gamedir))) for gamedir in keep}
+    for key in list(filesystems):
+        if key not in keep:
+            filesystems.pop(key).close()
@@ -0,0 +1,60 @@
+import os
+import re
+import glob
+from . import keyvalues
+
+GAMEINFO = 'gameinfo.txt'
+
+# Numbered archives next to a VPK directory file, e.g. pak01_000.vpk
+VPK_CHUNK = re.compile(r'_\d{3}\.vpk$', re.IGNORECASE)
+
+def gameinfo_path(gamedir) -> str:
+    return os.path.join(gamedir, GAMEINFO)
+
+def load_gameinfo(gamedir) -> list:
+    '''The GameInfo block of gameinfo.txt'''
+    pairs = keyvalues.load(gameinfo_path(gamedir))
+    gameinfo = keyvalues.get(pairs, 'GameInfo')
+    if not isinstance(gameinfo, list):
+        raise keyvalues.KeyValuesError(f"No GameInfo block in '{gameinfo_path(gamedir)}'")
+    return gameinfo
+
+def search_paths(gamedir) -> list[tuple[str, str]]:
+    '''
+    Content search paths of a game as (kind, path), highest priority first.
+    kind is 'dir' for loose files or 'vpk' for a VPK directory file.
+    '''
+    gamedir = os.path.normpath(os.path.abspath(gamedir))
+    base = os.path.dirname(gamedir)     # Where the engine executable lives
+    filesystem = keyvalues.get(load_gameinfo(gamedir), 'FileSystem', [])
+    paths = keyvalues.get(filesystem, 'SearchPaths', []) if isinstance(filesystem, list) else []
+
+    result = []
+    for key, value in paths:
+        if not isinstance(value, str) or 'game' not in key.lower().split('+'):
+            continue
+        path = value.replace('|gameinfo_path|', gamedir + os.sep).replace('|all_source_engine_paths|', base + os.sep)
+        path = os.path.normpath(os.path.join(base, path))
+
+        if path.lower().endswith('.vpk'):
+            # "pak01.vpk" refers to pak01_dir.vpk
+            directory = path[:-len('.vpk')] + '_dir.vpk'
+            if os.path.isfile(directory):
+                result.append(('vpk', directory))
+        elif path.endswith('*'):
+            # Every add-on folder and VPK in e.g. custom/*
+            for match in sorted(glob.glob(path)):
+                if os.path.isdir(match):
+                    result.append(('dir', match))
+                elif match.lower().endswith('.vpk') and not VPK_CHUNK.search(match):
+                    result.append(('vpk', match))
+        elif os.path.isdir(path):
+            result.append(('dir', path))
+
+    # Keep the first of any duplicates
+    unique, seen = [], set()
+    for kind, path in result:
+        if os.path.normcase(path) not in seen:
+            seen.add(os.path.normcase(path))
+            unique.append((kind, path))
+    return unique
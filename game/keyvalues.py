@@ -0,0 +1,77 @@
+import re
+
+# Valve KeyValues text format, as used by gameinfo.txt and the script files.
+# Parsed into lists of (key, value) pairs since keys can repeat (e.g. SearchPaths),
+# where a value is either a string or a nested list.
+
+TOKEN = re.compile(r'''
+    \s+                         # whitespace
+  | //[^\n]*                    # comment
+  | "([^"]*)"?                  # quoted string, without escapes like Valve's default
+  | (\{|\})                     # braces
+  | (\[[^\]\n]*\])              # platform conditional
+  | ([^\s"{}]+)                 # unquoted string
+''', re.VERBOSE)
+
+class KeyValuesError(ValueError):
+    pass
+
+def tokenize(text: str):
+    pos = 0
+    while pos < len(text):
+        match = TOKEN.match(text, pos)
+        if match is None:
+            raise KeyValuesError(f'Unexpected character at offset {pos}')
+        pos = match.end()
+        quoted, brace, conditional, word = match.groups()
+        if quoted is not None:
+            yield 'string', quoted
+        elif brace is not None:
+            yield brace, brace
+        elif conditional is not None:
+            yield 'conditional', conditional
+        elif word is not None:
+            yield 'string', word
+
+def parse(text: str) -> list:
+    '''Parse KeyValues text into a list of (key, value) pairs'''
+    stack = [[]]
+    key = None
+    for kind, value in tokenize(text):
+        if kind == 'string':
+            if key is None:
+                key = value
+            else:
+                stack[-1].append((key, value))
+                key = None
+        elif kind == '{':
+            if key is None:
+                raise KeyValuesError('Block without a key')
+            block = []
+            stack[-1].append((key, block))
+            stack.append(block)
+            key = None
+        elif kind == '}':
+            if len(stack) == 1:
+                raise KeyValuesError('Unbalanced closing brace')
+            stack.pop()
+            key = None
+        # Conditionals apply to the previous pair, and all platforms are treated alike
+
+    return stack[0]
+
+def load(path) -> list:
+    with open(path, encoding='utf-8', errors='replace') as f:
+        return parse(f.read())
+
+def get(pairs: list, key: str, default=None):
+    '''First value for a key, ignoring case'''
+    key = key.lower()
+    for k, v in pairs:
+        if k.lower() == key:
+            return v
+    return default
+
+def get_all(pairs: list, key: str) -> list:
+    key = key.lower()
+    return [v for k, v in pairs if k.lower() == key]
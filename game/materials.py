@@ -0,0 +1,33 @@
+from .filesystem import GameFileSystem, normalize
+
+class MaterialResolver:
+    '''
+    Finds the VMT for a material name the way the engine does, by trying each
+    $cdmaterials folder in order. Results are cached until the game index changes.
+    '''
+
+    def __init__(self):
+        self.cache: dict[tuple, str | None] = {}
+        self.generations: dict[str, int] = {}
+
+    def resolve(self, filesystem: GameFileSystem, cdmaterials: list[str], name: str) -> str | None:
+        '''Game path of the material's VMT, or None if no folder has it'''
+        filesystem.ensure()
+        if self.generations.get(filesystem.gamedir) != filesystem.generation:
+            self.generations[filesystem.gamedir] = filesystem.generation
+            self.cache = {k: v for k, v in self.cache.items() if k[0] != filesystem.gamedir}
+
+        key = (filesystem.gamedir, tuple(cdmaterials), name)
+        if key not in self.cache:
+            self.cache[key] = None
+            for folder in cdmaterials or ['']:
+                path = normalize(f'materials/{folder}/{name}.vmt')
+                if path in filesystem.files:
+                    self.cache[key] = path
+                    break
+        return self.cache[key]
+
+    def missing(self, filesystem: GameFileSystem, cdmaterials: list[str], names) -> list[str]:
+        return sorted(name for name in set(names) if self.resolve(filesystem, cdmaterials, name) is None)
+
+resolver = MaterialResolver()
@@ -0,0 +1,95 @@
+import os
+import json
+import hashlib
+from . import keyvalues
+from .filesystem import GameFileSystem, normalize
+from ..util.cache import cache_dir
+
+MANIFEST = 'scripts/surfaceproperties_manifest.txt'
+FALLBACK = 'scripts/surfaceproperties.txt'
+
+# Bump when the cached layout changes
+CACHE_VERSION = 1
+
+# Density of the engine's "default" surfaceprop, in kg/m³
+DEFAULT_DENSITY = 2000.0
+
+def parse_manifest(text: str) -> list[str]:
+    manifest = keyvalues.get(keyvalues.parse(text), 'surfaceproperties_manifest', [])
+    return [normalize(path) for path in keyvalues.get_all(manifest, 'file') if isinstance(path, str)]
+
+def parse_surfaceprops(text: str, raw: dict):
+    '''Add the surfaceprops defined in a script to raw, keeping earlier definitions'''
+    for name, block in keyvalues.parse(text):
+        if isinstance(block, list):
+            raw.setdefault(name.lower(), {k.lower(): v for k, v in block if isinstance(v, str)})
+
+def resolve(raw: dict) -> dict:
+    '''
+    Apply base inheritance.
+    Returns {name: {'base': base name or None, 'density': kg/m³}}.
+    '''
+    resolved = {}
+
+    def density(name, seen):
+        props = raw.get(name)
+        if props is None or name in seen:
+            return DEFAULT_DENSITY
+        if 'density' in props:
+            try:
+                return float(props['density'])
+            except ValueError:
+                pass
+        seen.add(name)
+        return density(props.get('base', 'default').lower(), seen)
+
+    for name, props in raw.items():
+        base = props.get('base')
+        resolved[name] = {'base': base.lower() if base else None, 'density': density(name, set())}
+    return resolved
+
+def text(data) -> str:
+    return bytes(data).decode('utf-8', 'replace')
+
+###############################################################################
+
+class SurfacePropLoader:
+    '''
+    Surfaceprops of a game, parsed from its scripts. Results are cached in
+    memory and on disk, keyed by the mtimes of the files they came from.
+    '''
+
+    def __init__(self):
+        self.cache: dict[str, dict] = {}
+
+    def load(self, filesystem: GameFileSystem) -> dict:
+        manifest = filesystem.read(MANIFEST)
+        files = parse_manifest(text(manifest)) if manifest is not None else [FALLBACK]
+        files = [path for path in files if filesystem.exists(path)]
+
+        sources = [(path, filesystem.mtime(path)) for path in [MANIFEST, *files]]
+        key = hashlib.sha1(json.dumps([CACHE_VERSION, filesystem.gamedir, sources]).encode()).hexdigest()[:16]
+        if key in self.cache:
+            return self.cache[key]
+
+        path = cache_dir('surfaceprops') / f'{key}.json'
+        try:
+            with open(path, encoding='utf-8') as f:
+                props = json.load(f)
+        except (OSError, ValueError):
+            raw = {}
+            for file in files:
+                parse_surfaceprops(text(filesystem.read(file)), raw)
+            props = resolve(raw)
+            tmp = path.with_name(path.name + f'.{os.getpid()}.tmp')
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(props, f)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"[Sourcery] Warning: Failed to cache surfaceprops '{path}': {e}")
+
+        self.cache[key] = props
+        return props
+
+loader = SurfacePropLoader()
@@ -0,0 +1,110 @@
+import os
+import mmap
+import struct
+
+# Valve Pak (VPK) archives, versions 1 and 2.
+# The _dir.vpk file holds a tree of every packed file, followed by the data of
+# files stored in it directly. Other data lives in numbered archives next to it.
+
+SIGNATURE = 0x55AA1234
+HEADER_V1 = struct.Struct('<III')       # signature, version, tree size
+HEADER_V2 = struct.Struct('<IIIIIII')   # ... file data, archive MD5, other MD5, signature section sizes
+ENTRY = struct.Struct('<IHHIIH')        # CRC, preload bytes, archive index, offset, length, terminator
+DIR_ARCHIVE = 0x7FFF                    # Data follows the tree in the _dir.vpk itself
+TERMINATOR = 0xFFFF
+
+class VPKError(ValueError):
+    pass
+
+def map_file(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+class VPK:
+    '''
+    Memory-mapped VPK archive. The tree is read once into a dictionary of
+    entries and reads are slices of the mapped archives, copied only when
+    a file is split between preload data and an archive.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.data = map_file(path)
+        self.archives = {}
+        self.entries: dict[str, tuple] = {}   # path -> (preload start, preload size, archive, offset, length)
+        self.read_tree()
+
+    def read_tree(self):
+        data = self.data
+        if len(data) < HEADER_V1.size:
+            raise VPKError(f"'{self.path}' is too small to be a VPK")
+        signature, version, tree_size = HEADER_V1.unpack_from(data, 0)
+        if signature != SIGNATURE:
+            raise VPKError(f"'{self.path}' is not a VPK")
+        if version == 1:
+            header_size = HEADER_V1.size
+        elif version == 2:
+            header_size = HEADER_V2.size
+        else:
+            raise VPKError(f"'{self.path}' has unsupported VPK version {version}")
+
+        self.data_start = header_size + tree_size
+        pos = header_size
+
+        def string():
+            nonlocal pos
+            end = data.find(b'\0', pos)
+            if end < 0 or end >= self.data_start:
+                raise VPKError(f"'{self.path}' has a truncated directory tree")
+            value = data[pos:end].decode('utf-8', 'replace')
+            pos = end + 1
+            return value
+
+        entries = self.entries
+        while ext := string():
+            while directory := string():
+                while name := string():
+                    crc, preload, archive, offset, length, terminator = ENTRY.unpack_from(data, pos)
+                    if terminator != TERMINATOR:
+                        raise VPKError(f"'{self.path}' has a malformed entry for '{name}'")
+                    pos += ENTRY.size
+
+                    # A single space stands for no folder or no extension
+                    path = name if ext == ' ' else f'{name}.{ext}'
+                    if directory != ' ':
+                        path = f'{directory}/{path}'
+                    entries[path.lower()] = (pos, preload, archive, offset, length)
+                    pos += preload
+
+    def archive(self, index):
+        if index == DIR_ARCHIVE:
+            return self.data
+        if index not in self.archives:
+            stem = self.path[:-len('_dir.vpk')]
+            self.archives[index] = map_file(f'{stem}_{index:03}.vpk')
+        return self.archives[index]
+
+    def read(self, path: str) -> memoryview | bytes | None:
+        entry = self.entries.get(path.lower())
+        if entry is None:
+            return None
+        preload_start, preload, index, offset, length = entry
+        head = memoryview(self.data)[preload_start:preload_start + preload]
+        if length == 0:
+            return head
+
+        if index == DIR_ARCHIVE:
+            offset += self.data_start
+        body = memoryview(self.archive(index))[offset:offset + length]
+        return bytes(head) + bytes(body) if preload else body
+
+    def close(self):
+        for archive in (self.data, *self.archives.values()):
+            if isinstance(archive, mmap.mmap):
+                try:
+                    archive.close()
+                except BufferError:
+                    pass    # Slices are still in use, the map is freed with them
+        self.archives = {}
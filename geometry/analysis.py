@@ -0,0 +1,169 @@
+import numpy as np
+
+class MeshStats:
+    '''
+    Bounds, volume and triangle counts of many meshes at once.
+    Each field has one entry per mesh.
+    '''
+
+    def __init__(self, count):
+        self.lo = np.zeros((count, 3))
+        self.hi = np.zeros((count, 3))
+        self.volume = np.zeros(count)
+        self.triangles = np.zeros(count, dtype=np.int64)
+
+    @property
+    def size(self):
+        return self.hi - self.lo
+
+    @property
+    def box_volume(self):
+        return np.prod(self.size, axis=1)
+
+    @property
+    def fill(self):
+        '''Fraction of the bounding box filled by the mesh'''
+        box = self.box_volume
+        return np.divide(self.volume, box, out=np.zeros_like(box), where=box > 0)
+
+    @staticmethod
+    def concatenate(parts) -> 'MeshStats':
+        '''Stats of the meshes of several batches, in order'''
+        stats = MeshStats(0)
+        stats.lo = np.concatenate([p.lo for p in parts])
+        stats.hi = np.concatenate([p.hi for p in parts])
+        stats.volume = np.concatenate([p.volume for p in parts])
+        stats.triangles = np.concatenate([p.triangles for p in parts])
+        return stats
+
+    def total(self) -> 'MeshStats':
+        '''Combined stats of all meshes, as if they were one'''
+        total = MeshStats(1)
+        if len(self.triangles):
+            total.lo[0] = self.lo.min(axis=0)
+            total.hi[0] = self.hi.max(axis=0)
+            total.volume[0] = self.volume.sum()
+            total.triangles[0] = self.triangles.sum()
+        return total
+
+def mesh_stats(positions, triangles, vertex_counts, triangle_counts) -> MeshStats:
+    '''
+    Stats for a batch of meshes concatenated into single arrays.
+    Triangle indices are local to each mesh.
+    '''
+    vertex_counts = np.asarray(vertex_counts, dtype=np.int64)
+    triangle_counts = np.asarray(triangle_counts, dtype=np.int64)
+    stats = MeshStats(len(vertex_counts))
+    stats.triangles = triangle_counts.copy()
+
+    has_verts = vertex_counts > 0
+    if not has_verts.any():
+        return stats
+
+    # Bounds: reduce over each mesh's contiguous range of vertices
+    vertex_starts = np.concatenate([[0], np.cumsum(vertex_counts)[:-1]])
+    starts = vertex_starts[has_verts]
+    stats.lo[has_verts] = np.minimum.reduceat(positions, starts, axis=0)
+    stats.hi[has_verts] = np.maximum.reduceat(positions, starts, axis=0)
+
+    # Volume: sum of signed tetrahedra against the origin, per mesh
+    if len(triangles):
+        mesh_of_tri = np.repeat(np.arange(len(triangle_counts)), triangle_counts)
+        global_tris = triangles + vertex_starts[mesh_of_tri, None]
+        v0, v1, v2 = (positions[global_tris[:, i]] for i in range(3))
+        signed = np.einsum('ij,ij->i', v0, np.cross(v1, v2)) / 6
+        stats.volume = np.abs(np.bincount(mesh_of_tri, weights=signed, minlength=len(triangle_counts)))
+
+    return stats
+
+def bounding_box(points):
+    '''(min, max) corners of a point set, or None if it is empty'''
+    if len(points) == 0:
+        return None
+    return points.min(axis=0), points.max(axis=0)
+
+def bounding_sphere(points, max_iterations=64):
+    '''
+    Sphere around a point set as (center, radius), or None if it is empty.
+    Ritter's algorithm: start from two far apart points, then grow the sphere
+    towards the farthest point outside it until none are left.
+    '''
+    if len(points) == 0:
+        return None
+    points = np.asarray(points, dtype=np.float64)
+    a = points[np.argmax(np.linalg.norm(points - points[0], axis=1))]
+    b = points[np.argmax(np.linalg.norm(points - a, axis=1))]
+    center, radius = (a + b) / 2, np.linalg.norm(b - a) / 2
+
+    for _ in range(max_iterations):
+        dist = np.linalg.norm(points - center, axis=1)
+        i = int(np.argmax(dist))
+        if dist[i] <= radius:
+            return center, float(radius)
+        # Move the far side of the sphere out to the point
+        new_radius = (radius + dist[i]) / 2
+        center = center + (points[i] - center) * ((new_radius - radius) / dist[i])
+        radius = new_radius
+
+    return center, float(np.linalg.norm(points - center, axis=1).max())
+
+def merge_boxes(boxes):
+    '''Box around (min, max) boxes, or None if there are none'''
+    boxes = [box for box in boxes if box is not None]
+    if not boxes:
+        return None
+    return np.min([lo for lo, _ in boxes], axis=0), np.max([hi for _, hi in boxes], axis=0)
+
+def merge_spheres(spheres):
+    '''
+    Sphere around (center, radius) spheres, or None if there are none. Each one
+    is merged into the sphere so far, so it can be a little larger than a
+    sphere found from all of their points at once.
+    '''
+    spheres = [sphere for sphere in spheres if sphere is not None]
+    if not spheres:
+        return None
+    center, radius = spheres[0]
+    for other, other_radius in spheres[1:]:
+        distance = float(np.linalg.norm(other - center))
+        if distance + other_radius <= radius:
+            continue
+        if distance + radius <= other_radius:
+            center, radius = other, other_radius
+            continue
+        new_radius = (distance + radius + other_radius) / 2
+        center = center + (other - center) * ((new_radius - radius) / distance)
+        radius = new_radius
+    return center, float(radius)
+
+###############################################################################
+
+# Reasons recorded in the export for each automatic choice
+AUTO_BOX = 'box_fill'
+AUTO_HULL_SIZE = 'size'
+AUTO_HULL_TRIANGLES = 'triangles'
+AUTO_MESH = 'default'
+
+def resolve_auto(stats: MeshStats, box_fill, hull_size, mesh_triangles):
+    '''
+    Pick a collision mode for each mesh:
+        - box if it fills most of its bounding box
+        - hull if it is small enough that concavity doesn't matter
+        - hull if it has too many triangles to be a cheap concave collider
+        - mesh otherwise
+    Returns arrays of modes and reasons.
+    '''
+    count = len(stats.triangles)
+    modes = np.full(count, 'mesh', dtype=object)
+    reasons = np.full(count, AUTO_MESH, dtype=object)
+
+    too_many = stats.triangles > mesh_triangles
+    modes[too_many], reasons[too_many] = 'hull', AUTO_HULL_TRIANGLES
+
+    small = stats.size.max(axis=1) <= hull_size
+    modes[small], reasons[small] = 'hull', AUTO_HULL_SIZE
+
+    boxy = stats.fill >= box_fill
+    modes[boxy], reasons[boxy] = 'box', AUTO_BOX
+
+    return modes, reasons
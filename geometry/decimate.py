@@ -0,0 +1,187 @@
+import heapq
+import numpy as np
+
+# Quadric error metric edge collapse, after Garland and Heckbert, "Surface Simplification
+# Using Quadric Error Metrics". Vertices only ever collapse onto a neighbor, so every
+# vertex that's left is an original one and keeps its normals, UVs and colors.
+# Quadrics and the first round of costs are computed with NumPy, the collapses
+# themselves are sequential and run on plain lists.
+
+# Weight of the planes that hold open edges in place, relative to face planes
+BOUNDARY_WEIGHT = 10.0
+
+def plane_quadrics(planes, weights) -> np.ndarray:
+    '''Weighted outer products of planes (a, b, c, d), as (N, 4, 4)'''
+    return np.einsum('ni,nj->nij', planes, planes) * weights[:, None, None]
+
+def vertex_quadrics(positions, triangles) -> np.ndarray:
+    '''Error quadric of each vertex: its faces' planes, plus planes along open edges'''
+    p = positions[triangles]
+    cross = np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+    length = np.linalg.norm(cross, axis=1)
+    normals = cross / np.maximum(length, 1e-30)[:, None]
+    planes = np.hstack([normals, -np.einsum('ij,ij->i', normals, p[:, 0])[:, None]])
+
+    quadrics = np.zeros((len(positions), 4, 4))
+    face = plane_quadrics(planes, length / 2)
+    for i in range(3):
+        np.add.at(quadrics, triangles[:, i], face)
+
+    # Edges used by a single face, held by a plane through the edge along the face normal
+    edges = np.stack([triangles, np.roll(triangles, -1, axis=1)], axis=2).reshape(-1, 2)
+    _, inverse, counts = np.unique(np.sort(edges, axis=1), axis=0, return_inverse=True, return_counts=True)
+    open_edges = counts[inverse.ravel()] == 1
+    if open_edges.any():
+        a, b = positions[edges[open_edges, 0]], positions[edges[open_edges, 1]]
+        n = np.repeat(normals, 3, axis=0)[open_edges]
+        side = np.cross(b - a, n)
+        side_length = np.linalg.norm(side, axis=1)
+        side /= np.maximum(side_length, 1e-30)[:, None]
+        planes = np.hstack([side, -np.einsum('ij,ij->i', side, a)[:, None]])
+        edge = plane_quadrics(planes, BOUNDARY_WEIGHT * np.einsum('ij,ij->i', b - a, b - a))
+        np.add.at(quadrics, edges[open_edges, 0], edge)
+        np.add.at(quadrics, edges[open_edges, 1], edge)
+    return quadrics
+
+def quadric_error(q, x, y, z) -> float:
+    '''vᵀ Q v for v = (x, y, z, 1) and a flattened symmetric 4x4 Q'''
+    return (q[0] * x * x + q[5] * y * y + q[10] * z * z + q[15]
+            + 2 * (q[1] * x * y + q[2] * x * z + q[6] * y * z + q[3] * x + q[7] * y + q[11] * z))
+
+def lod_chain(positions, triangles, locked, targets, groups=None):
+    '''
+    Collapse edges of a triangle mesh in order of least error, taking a snapshot
+    each time the triangle count drops to one of targets (largest first).
+    Vertices with the same group id share a position, like the two sides of a UV
+    seam, and collapse together onto a matching group so seams stay closed.
+    Locked vertices are never moved. Returns [(triangles, face ids), ...] with one
+    entry per target, where face ids give the input triangle each one came from.
+    '''
+    positions = np.asarray(positions, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    count = len(positions)
+    if groups is None:
+        groups = np.arange(count)
+    groups = np.unique(np.asarray(groups, dtype=np.int64), return_inverse=True)[1].ravel()
+    group_count = int(groups.max()) + 1 if count else 0
+
+    # Quadrics, costs and versions are per group, over the mesh with seams closed
+    group_positions = np.zeros((group_count, 3))
+    group_positions[groups] = positions
+    group_triangles = groups[triangles]
+    quadrics = vertex_quadrics(group_positions, group_triangles) if len(triangles) else np.zeros((group_count, 4, 4))
+    group_locked = np.zeros(group_count, dtype=bool)
+    np.logical_or.at(group_locked, groups, np.asarray(locked, dtype=bool))
+
+    # Cheapest allowed direction for every edge, all at once
+    edges = np.sort(np.stack([group_triangles, np.roll(group_triangles, -1, axis=1)], axis=2).reshape(-1, 2), axis=1)
+    edges = np.unique(edges[edges[:, 0] != edges[:, 1]], axis=0)
+    a, b = edges[:, 0], edges[:, 1]
+    summed = quadrics[a] + quadrics[b]
+    homogeneous = np.hstack([group_positions, np.ones((group_count, 1))])
+    to_b = np.einsum('ni,nij,nj->n', homogeneous[b], summed, homogeneous[b])
+    to_a = np.einsum('ni,nij,nj->n', homogeneous[a], summed, homogeneous[a])
+    to_b[group_locked[a]] = np.inf
+    to_a[group_locked[b]] = np.inf
+    move_a = to_b <= to_a
+    costs = np.where(move_a, to_b, to_a)
+    sources, dests = np.where(move_a, a, b), np.where(move_a, b, a)
+    allowed = np.isfinite(costs)
+    heap = [(c, u, v, 0, 0) for c, u, v in zip(costs[allowed].tolist(), sources[allowed].tolist(), dests[allowed].tolist())]
+    heapq.heapify(heap)
+
+    pos = group_positions.tolist()
+    quads = quadrics.reshape(-1, 16).tolist()
+    is_locked = group_locked.tolist()
+    group_of = groups.tolist()
+    members = [[] for _ in range(group_count)]
+    for v, g in enumerate(group_of):
+        members[g].append(v)
+    faces = triangles.tolist()
+    face_alive = np.ones(len(faces), dtype=bool)
+    faces_of = [set() for _ in range(count)]
+    for f, tri in enumerate(faces):
+        for v in tri:
+            faces_of[v].add(f)
+    version = [0] * group_count
+    alive = len(faces)
+
+    def normal(p, q, r):
+        ux, uy, uz = q[0] - p[0], q[1] - p[1], q[2] - p[2]
+        vx, vy, vz = r[0] - p[0], r[1] - p[1], r[2] - p[2]
+        return uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+
+    def push(u, v):
+        q = [x + y for x, y in zip(quads[u], quads[v])]
+        heapq.heappush(heap, (quadric_error(q, *pos[v]), u, v, version[u], version[v]))
+
+    def pairs(group_u, group_v):
+        '''Vertex of group_v each used vertex of group_u collapses onto, or None if one has no single match'''
+        result = []
+        for u in members[group_u]:
+            if not faces_of[u]:
+                continue
+            matches = {w for f in faces_of[u] for w in faces[f] if group_of[w] == group_v}
+            if len(matches) != 1:
+                return None
+            result.append((u, matches.pop()))
+        return result
+
+    def can_collapse(u, v, target) -> bool:
+        shared = faces_of[u] & faces_of[v]
+        ring_u = {w for f in faces_of[u] for w in faces[f]} - {u, v}
+        ring_v = {w for f in faces_of[v] for w in faces[f]} - {u, v}
+        if len(ring_u & ring_v) != len(shared):
+            return False    # Would pinch the surface into a non-manifold edge
+        for f in faces_of[u] - shared:
+            tri = faces[f]
+            old = normal(*(pos[group_of[w]] for w in tri))
+            new = normal(*(target if w == u else pos[group_of[w]] for w in tri))
+            if old[0] * new[0] + old[1] * new[1] + old[2] * new[2] <= 0:
+                return False    # Would flip a face
+        return True
+
+    def collapse(group_u, group_v) -> bool:
+        nonlocal alive
+        matched = pairs(group_u, group_v)
+        if not matched or not all(can_collapse(u, v, pos[group_v]) for u, v in matched):
+            return False
+
+        for u, v in matched:
+            shared = faces_of[u] & faces_of[v]
+            for f in shared:
+                face_alive[f] = False
+                alive -= 1
+                for w in faces[f]:
+                    faces_of[w].discard(f)
+            for f in faces_of[u]:
+                faces[f] = [v if w == u else w for w in faces[f]]
+                faces_of[v].add(f)
+            faces_of[u] = set()
+        quads[group_v] = [x + y for x, y in zip(quads[group_u], quads[group_v])]
+        version[group_u] += 1
+        version[group_v] += 1
+
+        ring = {group_of[w] for v in members[group_v] for f in faces_of[v] for w in faces[f]} - {group_v}
+        for w in ring:
+            if not is_locked[w]:
+                push(w, group_v)
+            if not is_locked[group_v]:
+                push(group_v, w)
+        return True
+
+    def snapshot():
+        ids = np.flatnonzero(face_alive)
+        tris = np.array(faces, dtype=np.uint32).reshape(-1, 3)[ids]
+        return tris, ids
+
+    results = []
+    targets = sorted(targets, reverse=True)
+    for target in targets:
+        while alive > target and heap:
+            _, u, v, version_u, version_v = heapq.heappop(heap)
+            if version[u] != version_u or version[v] != version_v:
+                continue
+            collapse(u, v)
+        results.append(snapshot())
+    return results
@@ -0,0 +1,225 @@
+import heapq
+import numpy as np
+from .hull import convex_hull
+
+def convex_decomposition(positions, triangles, max_pieces=16, max_vertices=32, resolution=32, concavity=0.01):
+    '''
+    Approximate convex decomposition of a triangle mesh, in the spirit of V-HACD.
+    Returns a list of (vertices, triangles) hulls, at most max_pieces long.
+
+    The mesh is voxelized and the piece with the most concavity (hull volume
+    not covered by voxels) is cut in two along an axis plane until every piece
+    is convex enough or the piece budget is used up. A few cut planes are tried
+    per axis and scored by the hull volume of each side.
+    '''
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    if len(positions) < 4:
+        return []
+
+    if max_pieces <= 1 or len(triangles) == 0:
+        hull = convex_hull(positions, max_vertices)
+        return [as_piece(hull)] if hull is not None else []
+
+    voxels = Voxels(positions, triangles, resolution)
+    pieces = Pieces(voxels, max_vertices)
+    root = pieces.add(voxels.solid)
+    if root is None:
+        return []
+
+    threshold = concavity * max(pieces.volume[root], voxels.cell_volume)
+    queue = [(-pieces.concavity[root], root)]
+    while queue and len(pieces.hulls) < max_pieces:
+        worst, label = heapq.heappop(queue)
+        if -worst <= threshold:
+            break
+        halves = pieces.split(label)
+        if halves is None:
+            continue
+        for half in halves:
+            heapq.heappush(queue, (-pieces.concavity[half], half))
+
+    return [as_piece(hull) for hull in pieces.hulls.values()]
+
+def as_piece(hull):
+    vertices, triangles = hull
+    return vertices.astype(np.float32), triangles
+
+def hull_volume(vertices, triangles):
+    v0, v1, v2 = (vertices[triangles[:, i]] for i in range(3))
+    return abs(float(np.einsum('ij,ij->', v0, np.cross(v1, v2)))) / 6
+
+###############################################################################
+
+def sample_triangles(positions, triangles, spacing):
+    '''Points on a regular barycentric grid over each triangle, at most spacing apart'''
+    a, b, c = (positions[triangles[:, i]] for i in range(3))
+    longest = np.max([np.linalg.norm(b - a, axis=1), np.linalg.norm(c - b, axis=1), np.linalg.norm(a - c, axis=1)], axis=0)
+    steps = np.maximum(np.ceil(longest / spacing).astype(np.int64), 1)
+
+    samples = []
+    for n in np.unique(steps):
+        i, j = np.meshgrid(np.arange(n + 1), np.arange(n + 1), indexing='ij')
+        keep = i + j <= n
+        u, v = i[keep] / n, j[keep] / n
+        group = steps == n
+        ga, gb, gc = a[group], b[group], c[group]
+        # (triangles, samples, 3)
+        pts = ga[:, None] + (gb - ga)[:, None] * u[None, :, None] + (gc - ga)[:, None] * v[None, :, None]
+        samples.append(pts.reshape(-1, 3))
+    return np.concatenate(samples)
+
+def fill_exterior(surface):
+    '''Voxels reachable from outside the grid without crossing the surface'''
+    free = ~np.pad(surface, 1)
+    outside = np.zeros_like(free)
+    outside[[0, -1], :, :] = outside[:, [0, -1], :] = outside[:, :, [0, -1]] = True
+    outside &= free
+    while True:
+        grown = outside.copy()
+        grown[1:] |= outside[:-1]
+        grown[:-1] |= outside[1:]
+        grown[:, 1:] |= outside[:, :-1]
+        grown[:, :-1] |= outside[:, 1:]
+        grown[:, :, 1:] |= outside[:, :, :-1]
+        grown[:, :, :-1] |= outside[:, :, 1:]
+        grown &= free
+        if np.array_equal(grown, outside):
+            return outside[1:-1, 1:-1, 1:-1]
+        outside = grown
+
+class Voxels:
+    '''
+    Solid voxelization of a mesh. Open meshes leak, leaving only the surface voxels.
+    Surface samples are kept so hulls can hug the real surface instead of voxel corners.
+    '''
+
+    def __init__(self, positions, triangles, resolution):
+        lo, hi = positions.min(axis=0), positions.max(axis=0)
+        self.size = max(float((hi - lo).max()), 1e-9) / resolution
+        self.origin = lo
+        self.dims = tuple(np.maximum(np.ceil((hi - lo) / self.size).astype(np.int64), 1))
+        self.cell_volume = self.size ** 3
+
+        self.samples = sample_triangles(positions, triangles, self.size / 2)
+        cells = np.clip(((self.samples - lo) / self.size).astype(np.int64), 0, np.array(self.dims) - 1)
+        self.sample_cells = np.ravel_multi_index(cells.T, self.dims)
+
+        self.surface = np.zeros(self.dims, dtype=bool)
+        self.surface.flat[self.sample_cells] = True
+        self.solid = ~fill_exterior(self.surface)
+
+    def centers(self, cells):
+        return self.origin + (cells + 0.5) * self.size
+
+# Cut planes tried per axis when splitting a piece
+CUT_CANDIDATES = 8
+
+# Extra cost of a cut per unit of imbalance between the two halves
+BALANCE_WEIGHT = 0.05
+
+class Pieces:
+    '''Voxel pieces of a decomposition with their hulls, concavity and volume'''
+
+    def __init__(self, voxels: Voxels, max_vertices):
+        self.voxels = voxels
+        self.max_vertices = max_vertices
+        self.candidates = CUT_CANDIDATES
+        self.labels = np.full(voxels.dims, -1, dtype=np.int32)
+        self.hulls = {}
+        self.concavity = {}
+        self.volume = {}
+        self.next_label = 0
+
+    def add(self, mask):
+        '''Make a new piece from a mask of voxels, or None if it has no hull'''
+        label = self.next_label
+        self.next_label += 1
+        self.labels[mask] = label
+
+        hull = convex_hull(self.points(label), self.max_vertices)
+        if hull is None:
+            return None
+        self.hulls[label] = hull
+        self.volume[label] = hull_volume(*hull)
+        filled = np.count_nonzero(mask) * self.voxels.cell_volume
+        self.concavity[label] = max(self.volume[label] - filled, 0.0)
+        return label
+
+    def points(self, label):
+        '''Surface samples in the piece, plus voxel centers on faces where it was cut'''
+        voxels = self.voxels
+        inside = self.labels == label
+        samples = voxels.samples[inside.flat[voxels.sample_cells]]
+
+        # Interior voxels next to another piece
+        padded = np.pad(self.labels, 1, constant_values=-1)
+        cut = np.zeros_like(inside)
+        for axis in range(3):
+            for shift in (-1, 1):
+                neighbor = np.roll(padded, shift, axis)[1:-1, 1:-1, 1:-1]
+                cut |= (neighbor >= 0) & (neighbor != label)
+        cut &= inside & ~voxels.surface
+
+        return np.concatenate([samples, voxels.centers(np.argwhere(cut))])
+
+    def split(self, label):
+        '''Cut a piece in two at the best axis plane, returning the new labels'''
+        inside = self.labels == label
+        cells = np.argwhere(inside)
+        shell = np.argwhere(inside & ~binary_erode(inside))
+
+        best = None
+        for axis in range(3):
+            for position in cut_positions(cells[:, axis], self.candidates):
+                cost = cut_cost(cells, shell, axis, position, self.max_vertices)
+                if best is None or cost < best[0]:
+                    best = (cost, axis, position)
+        if best is None:
+            return None
+
+        _, axis, position = best
+        left = cells[cells[:, axis] <= position]
+        right = cells[cells[:, axis] > position]
+        del self.hulls[label], self.concavity[label], self.volume[label]
+
+        halves = []
+        for part in (left, right):
+            mask = np.zeros_like(inside)
+            mask[tuple(part.T)] = True
+            half = self.add(mask)
+            if half is not None:
+                halves.append(half)
+        return halves
+
+def binary_erode(mask):
+    '''Voxels whose 6 neighbors are all set'''
+    padded = np.pad(mask, 1)
+    core = padded[1:-1, 1:-1, 1:-1].copy()
+    for axis in range(3):
+        for shift in (-1, 1):
+            core &= np.roll(padded, shift, axis)[1:-1, 1:-1, 1:-1]
+    return core
+
+def cut_positions(slices, count):
+    '''Evenly spaced cuts between the first and last slice of a piece'''
+    first, last = int(slices.min()), int(slices.max())
+    if first == last:
+        return []
+    return np.unique(np.linspace(first, last - 1, min(count, last - first)).round().astype(np.int64))
+
+def cut_cost(cells, shell, axis, position, max_vertices):
+    '''
+    Hull volume of both sides of a cut, in voxels. Only the shell of each side
+    can be on its hull. Uneven cuts cost a little more so rectilinear shapes,
+    where many cuts tie, are cut in the middle.
+    '''
+    total = 0.0
+    for side, face in ((shell[:, axis] <= position, cells[:, axis] == position),
+                       (shell[:, axis] > position, cells[:, axis] == position + 1)):
+        hull = convex_hull(np.concatenate([shell[side], cells[face]]), max_vertices)
+        if hull is not None:
+            total += hull_volume(*hull)
+    left = np.count_nonzero(cells[:, axis] <= position)
+    imbalance = abs(2 * left - len(cells)) / len(cells)
+    return total * (1 + BALANCE_WEIGHT * imbalance)
@@ -0,0 +1,163 @@
+import heapq
+import numpy as np
+
+def convex_hull(points, max_vertices=None):
+    '''
+    Quickhull. Returns (vertices, triangles) with outward-facing winding,
+    or None if the points are degenerate (flat or fewer than 4 points).
+    If max_vertices is set, stops early with an approximate (inner) hull.
+    '''
+    pts = np.unique(np.asarray(points, dtype=np.float64).reshape(-1, 3), axis=0)
+    if len(pts) < 4:
+        return None
+
+    extent = pts.max(axis=0) - pts.min(axis=0)
+    eps = max(float(extent.max()), 1e-12) * 1e-9
+
+    simplex = initial_simplex(pts, eps)
+    if simplex is None:
+        return None
+
+    hull = Quickhull(pts, eps)
+    hull.build(simplex, max_vertices)
+    return hull.result()
+
+def initial_simplex(pts, eps):
+    # Two extreme points along the widest axis
+    axis = np.argmax(pts.max(axis=0) - pts.min(axis=0))
+    i0, i1 = int(np.argmin(pts[:, axis])), int(np.argmax(pts[:, axis]))
+
+    # Farthest from the line
+    d = pts[i1] - pts[i0]
+    line_dist = np.linalg.norm(np.cross(pts - pts[i0], d), axis=1)
+    i2 = int(np.argmax(line_dist))
+    if line_dist[i2] <= eps * np.linalg.norm(d):
+        return None
+
+    # Farthest from the plane
+    n = np.cross(pts[i1] - pts[i0], pts[i2] - pts[i0])
+    n /= np.linalg.norm(n)
+    plane_dist = (pts - pts[i0]) @ n
+    i3 = int(np.argmax(np.abs(plane_dist)))
+    if abs(plane_dist[i3]) <= eps:
+        return None
+
+    return i0, i1, i2, i3
+
+class Quickhull:
+    def __init__(self, pts, eps):
+        self.pts = pts
+        self.eps = eps
+        self.faces = {}     # face id -> (a, b, c), counter-clockwise seen from outside
+        self.planes = {}    # face id -> (normal, offset)
+        self.outside = {}   # face id -> indices of points in front of the face
+        self.edges = {}     # directed edge (a, b) -> face id
+        self.next_id = 0
+
+    def add_face(self, a, b, c):
+        p = self.pts
+        n = np.cross(p[b] - p[a], p[c] - p[a])
+        length = np.linalg.norm(n)
+        if length > 0:
+            n /= length
+        fid = self.next_id
+        self.next_id += 1
+        self.faces[fid] = (a, b, c)
+        self.planes[fid] = (n, float(n @ p[a]))
+        self.outside[fid] = np.empty(0, dtype=np.int64)
+        for edge in ((a, b), (b, c), (c, a)):
+            self.edges[edge] = fid
+        return fid
+
+    def remove_face(self, fid):
+        a, b, c = self.faces.pop(fid)
+        for edge in ((a, b), (b, c), (c, a)):
+            if self.edges.get(edge) == fid:
+                del self.edges[edge]
+        del self.planes[fid], self.outside[fid]
+
+    def assign(self, candidates, face_ids):
+        '''Move each candidate point to the outside set of the face it is farthest in front of'''
+        if len(candidates) == 0 or not face_ids:
+            return
+        normals = np.array([self.planes[f][0] for f in face_ids])
+        offsets = np.array([self.planes[f][1] for f in face_ids])
+        dist = self.pts[candidates] @ normals.T - offsets
+        best = np.argmax(dist, axis=1)
+        keep = dist[np.arange(len(candidates)), best] > self.eps
+        candidates, best = candidates[keep], best[keep]
+        for i, fid in enumerate(face_ids):
+            self.outside[fid] = candidates[best == i]
+
+    def build(self, simplex, max_vertices):
+        i0, i1, i2, i3 = simplex
+        centroid = self.pts[list(simplex)].mean(axis=0)
+        face_ids = []
+        p = self.pts
+        for a, b, c in ((i0, i1, i2), (i0, i1, i3), (i0, i2, i3), (i1, i2, i3)):
+            # Wind each face away from the centroid
+            if np.cross(p[b] - p[a], p[c] - p[a]) @ (centroid - p[a]) > 0:
+                b, c = c, b
+            face_ids.append(self.add_face(a, b, c))
+
+        others = np.setdiff1d(np.arange(len(self.pts)), simplex)
+        self.assign(others, face_ids)
+        num_vertices = 4
+
+        # Farthest points first, so stopping early still gives a good approximation
+        pending = []
+        for f in face_ids:
+            self.push(pending, f)
+        while pending:
+            if max_vertices is not None and num_vertices >= max_vertices:
+                break
+            _, fid, eye = heapq.heappop(pending)
+            if fid not in self.faces:
+                continue
+            eye_pos = self.pts[eye]
+
+            # Flood fill the faces the new point can see
+            visible, stack = {fid}, [fid]
+            while stack:
+                a, b, c = self.faces[stack.pop()]
+                for edge in ((b, a), (c, b), (a, c)):
+                    twin = self.edges.get(edge)
+                    if twin is not None and twin not in visible:
+                        n, d = self.planes[twin]
+                        if n @ eye_pos - d > self.eps:
+                            visible.add(twin)
+                            stack.append(twin)
+
+            # Horizon: edges of visible faces whose twin is not visible
+            horizon = []
+            for f in visible:
+                a, b, c = self.faces[f]
+                for edge in ((a, b), (b, c), (c, a)):
+                    if self.edges.get(edge[::-1]) not in visible:
+                        horizon.append(edge)
+
+            orphans = np.concatenate([self.outside[f] for f in visible])
+            orphans = orphans[orphans != eye]
+            for f in visible:
+                self.remove_face(f)
+
+            new_ids = [self.add_face(a, b, eye) for a, b in horizon]
+            self.assign(orphans, new_ids)
+            for f in new_ids:
+                self.push(pending, f)
+            num_vertices += 1
+
+    def push(self, pending, fid):
+        '''Queue a face by the farthest point in front of it'''
+        candidates = self.outside[fid]
+        if len(candidates) == 0:
+            return
+        n, d = self.planes[fid]
+        dist = self.pts[candidates] @ n - d
+        i = int(np.argmax(dist))
+        heapq.heappush(pending, (-float(dist[i]), fid, int(candidates[i])))
+
+    def result(self):
+        tris = np.array(list(self.faces.values()), dtype=np.int64)
+        used, remap = np.unique(tris, return_inverse=True)
+        return self.pts[used], remap.reshape(-1, 3).astype(np.uint32)
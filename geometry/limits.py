@@ -0,0 +1,51 @@
+import numpy as np
+
+def over_limits(counts: dict, limits: dict) -> dict:
+    '''
+    Compare per-mesh counts against limits in one pass.
+    Both are keyed by what is counted, e.g. {'vertices': array, 'triangles': array}.
+    Returns a mask of the meshes over each limit.
+    '''
+    return {key: np.asarray(counts[key]) > limit for key, limit in limits.items() if key in counts}
+
+def weld(attributes: dict, indices):
+    '''
+    Merge vertices whose attributes are all identical.
+    Returns the welded attributes and remapped indices.
+    '''
+    count = len(next(iter(attributes.values())))
+    rows = [np.ascontiguousarray(a).reshape(count, -1).view(np.uint8).reshape(count, -1) for a in attributes.values()]
+    keys = np.ascontiguousarray(np.hstack(rows))
+    keys = keys.view(np.dtype((np.void, keys.shape[1]))).ravel()
+    _, first, remap = np.unique(keys, return_index=True, return_inverse=True)
+
+    # Keep the first occurrence order so the vertex cache order is mostly preserved
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    kept = first[order]
+    return {name: a[kept] for name, a in attributes.items()}, rank[remap.ravel()][np.asarray(indices)]
+
+def split_triangles(triangles, max_vertices, max_triangles):
+    '''
+    Split a triangle list into consecutive chunks with at most max_vertices
+    unique vertices and max_triangles triangles each.
+    Returns a list of (vertex ids, triangles indexing into them).
+    '''
+    triangles = np.asarray(triangles).reshape(-1, 3)
+    chunks = []
+    start = 0
+    while start < len(triangles):
+        window = triangles[start:start + max_triangles]
+
+        # Number of distinct vertices used by the first k triangles of the window
+        _, first = np.unique(window.ravel(), return_index=True)
+        new_per_triangle = np.bincount(first // 3, minlength=len(window))
+        fits = np.searchsorted(np.cumsum(new_per_triangle), max_vertices, side='right')
+        count = max(int(fits), 1)
+
+        chunk = window[:count]
+        used, local = np.unique(chunk.ravel(), return_inverse=True)
+        chunks.append((used, local.reshape(-1, 3)))
+        start += count
+    return chunks
@@ -0,0 +1,106 @@
+import numpy as np
+
+# Second moment of the canonical tetrahedron (0, x, y, z), see Blow and Binstock,
+# "How to find the inertia tensor (or other mass properties) of a 3D solid body
+# represented by a triangle mesh". For a tetrahedron (0, a, b, c):
+#   ∫ p pᵀ dV = det(a, b, c) / 120 * (a aᵀ + b bᵀ + c cᵀ + (a + b + c)(a + b + c)ᵀ)
+
+class MassProperties:
+    '''
+    Volume, center of mass and inertia of many closed meshes at once, at unit density.
+    Each field has one entry per mesh.
+    '''
+
+    def __init__(self, count):
+        self.volume = np.zeros(count)
+        self.center = np.zeros((count, 3))
+        self.covariance = np.zeros((count, 3, 3))   # ∫ (p - center)(p - center)ᵀ dV
+
+    def inertia(self, density=1.0) -> np.ndarray:
+        '''Inertia tensors about each center of mass'''
+        trace = np.trace(self.covariance, axis1=1, axis2=2)
+        return density * (trace[:, None, None] * np.eye(3) - self.covariance)
+
+    def select(self, mask) -> 'MassProperties':
+        '''Properties of some of the meshes'''
+        props = MassProperties(0)
+        props.volume, props.center, props.covariance = self.volume[mask], self.center[mask], self.covariance[mask]
+        return props
+
+    def scaled(self, factor) -> 'MassProperties':
+        '''Properties of the same meshes uniformly scaled by factor'''
+        props = MassProperties(0)
+        props.volume = self.volume * factor ** 3
+        props.center = self.center * factor
+        props.covariance = self.covariance * factor ** 5
+        return props
+
+    @staticmethod
+    def concatenate(parts) -> 'MassProperties':
+        '''Properties of the meshes of several batches, in order'''
+        props = MassProperties(0)
+        props.volume = np.concatenate([p.volume for p in parts])
+        props.center = np.concatenate([p.center for p in parts])
+        props.covariance = np.concatenate([p.covariance for p in parts])
+        return props
+
+    def total(self) -> 'MassProperties':
+        '''Combined properties of all meshes, as if they were one body'''
+        total = MassProperties(1)
+        volume = self.volume.sum()
+        if volume <= 0:
+            return total
+        center = (self.volume[:, None] * self.center).sum(axis=0) / volume
+
+        # Parallel axis theorem for each part's covariance
+        offset = self.center - center
+        shifted = self.covariance + self.volume[:, None, None] * np.einsum('ni,nj->nij', offset, offset)
+
+        total.volume[0] = volume
+        total.center[0] = center
+        total.covariance[0] = shifted.sum(axis=0)
+        return total
+
+def mass_properties(positions, triangles, vertex_counts, triangle_counts) -> MassProperties:
+    '''
+    Mass properties for a batch of meshes concatenated into single arrays,
+    by summing signed tetrahedra between each triangle and the origin.
+    Triangle indices are local to each mesh. Inside-out meshes are flipped.
+    '''
+    vertex_counts = np.asarray(vertex_counts, dtype=np.int64)
+    triangle_counts = np.asarray(triangle_counts, dtype=np.int64)
+    count = len(triangle_counts)
+    props = MassProperties(count)
+    if len(triangles) == 0:
+        return props
+
+    vertex_starts = np.concatenate([[0], np.cumsum(vertex_counts)[:-1]])
+    mesh_of_tri = np.repeat(np.arange(count), triangle_counts)
+    tris = np.asarray(triangles, dtype=np.int64) + vertex_starts[mesh_of_tri, None]
+    pts = np.asarray(positions, dtype=np.float64)
+
+    # Work relative to each mesh's first vertex to keep precision far from the origin
+    origin = pts[np.minimum(vertex_starts, len(pts) - 1)]
+    a, b, c = (pts[tris[:, i]] - origin[mesh_of_tri] for i in range(3))
+
+    det = np.einsum('ij,ij->i', a, np.cross(b, c))
+    volume = np.bincount(mesh_of_tri, weights=det, minlength=count) / 6
+    s = a + b + c
+    moment = np.stack([np.bincount(mesh_of_tri, weights=det * s[:, i], minlength=count) for i in range(3)], axis=1) / 24
+
+    outer = (np.einsum('ni,nj->nij', a, a) + np.einsum('ni,nj->nij', b, b)
+             + np.einsum('ni,nj->nij', c, c) + np.einsum('ni,nj->nij', s, s))
+    second = np.zeros((count, 9))
+    np.add.at(second, mesh_of_tri, (det[:, None, None] * outer).reshape(-1, 9))
+    second = second.reshape(count, 3, 3) / 120
+
+    # Flip inside-out meshes so every volume is positive
+    sign = np.where(volume < 0, -1.0, 1.0)
+    volume, moment, second = volume * sign, moment * sign[:, None], second * sign[:, None, None]
+
+    valid = volume > 0
+    center = np.divide(moment, volume[:, None], out=np.zeros_like(moment), where=valid[:, None])
+    props.volume = volume
+    props.center = center + origin
+    props.covariance = second - volume[:, None, None] * np.einsum('ni,nj->nij', center, center)
+    return props
@@ -0,0 +1,106 @@
+import numpy as np
+
+def oriented_box(vertices, triangles=None, max_normals=256):
+    '''
+    Tight oriented bounding box of a point set, ideally its convex hull.
+    Returns (center, axes, half_extents) where axes holds one unit axis per row.
+
+    Starts from the PCA axes, then tries every hull face normal as one axis
+    and finds the smallest rectangle in the remaining plane with rotating
+    calipers over the projected hull edges. The box with the least volume wins.
+    '''
+    pts = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    if len(pts) == 0:
+        return np.zeros(3), np.eye(3), np.zeros(3)
+
+    best = box_from_axes(pts, pca_axes(pts))
+
+    if triangles is not None and len(triangles):
+        tris = np.asarray(triangles).reshape(-1, 3)
+        normals, areas = face_normals(pts, tris)
+        keep = areas > 0
+        normals, areas = normals[keep], areas[keep]
+
+        # Largest faces first, skip near duplicate normals
+        normals = normals[np.argsort(-areas)]
+        normals = unique_directions(normals)[:max_normals]
+
+        edges = np.concatenate([tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]]])
+        edge_dirs = pts[edges[:, 1]] - pts[edges[:, 0]]
+
+        for normal in normals:
+            box = calipers_box(pts, normal, edge_dirs)
+            if box is not None and volume(box) < volume(best):
+                best = box
+
+    center, axes, half = best
+    if np.linalg.det(axes) < 0:
+        axes[2] = -axes[2]  # Keep the basis right-handed
+    return center, axes, half
+
+def pca_axes(pts):
+    centered = pts - pts.mean(axis=0)
+    _, vectors = np.linalg.eigh(centered.T @ centered)
+    return vectors.T[::-1]  # Major axis first
+
+def box_from_axes(pts, axes):
+    proj = pts @ axes.T
+    lo, hi = proj.min(axis=0), proj.max(axis=0)
+    center = ((lo + hi) / 2) @ axes
+    return center, axes.copy(), (hi - lo) / 2
+
+def volume(box):
+    return float(np.prod(box[2]))
+
+def face_normals(pts, tris):
+    n = np.cross(pts[tris[:, 1]] - pts[tris[:, 0]], pts[tris[:, 2]] - pts[tris[:, 0]])
+    length = np.linalg.norm(n, axis=1)
+    safe = np.where(length > 0, length, 1)
+    return n / safe[:, None], length / 2
+
+def unique_directions(dirs, tolerance=1e-6):
+    # Opposite normals give the same box
+    canonical = np.where((dirs @ np.array([1e-3, 1e-2, 1.0]) < 0)[:, None], -dirs, dirs)
+    _, first = np.unique(np.round(canonical / tolerance).astype(np.int64), axis=0, return_index=True)
+    return dirs[np.sort(first)]
+
+def calipers_box(pts, normal, edge_dirs):
+    # Basis for the plane perpendicular to the normal
+    helper = np.array([1.0, 0, 0]) if abs(normal[0]) < 0.9 else np.array([0, 1.0, 0])
+    u = np.cross(normal, helper)
+    u /= np.linalg.norm(u)
+    v = np.cross(normal, u)
+
+    pts2 = np.stack([pts @ u, pts @ v], axis=1)
+    dirs2 = np.stack([edge_dirs @ u, edge_dirs @ v], axis=1)
+    length = np.linalg.norm(dirs2, axis=1)
+    dirs2 = dirs2[length > 1e-12] / length[length > 1e-12, None]
+    if len(dirs2) == 0:
+        return None
+
+    # The minimum area rectangle has a side parallel to a hull edge,
+    # so only the angles of the projected edges need testing
+    angles = np.unique(np.round(np.mod(np.arctan2(dirs2[:, 1], dirs2[:, 0]), np.pi / 2), 9))
+    c, s = np.cos(angles), np.sin(angles)
+    a = pts2 @ np.stack([c, s])         # (points, angles) along the edge
+    b = pts2 @ np.stack([-s, c])        # perpendicular to the edge
+    area = np.ptp(a, axis=0) * np.ptp(b, axis=0)
+    i = int(np.argmin(area))
+
+    d1 = c[i] * u + s[i] * v
+    d2 = -s[i] * u + c[i] * v
+    return box_from_axes(pts, np.stack([d1, d2, normal]))
+
+def box_corners(center, axes, half):
+    '''The 8 corners of a box, for exporting it as a mesh'''
+    signs = np.array([[x, y, z] for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)], dtype=np.float64)
+    return center + (signs * half) @ axes
+
+BOX_TRIANGLES = np.array([
+    [0, 1, 3], [0, 3, 2],   # -x
+    [4, 6, 7], [4, 7, 5],   # +x
+    [0, 4, 5], [0, 5, 1],   # -y
+    [2, 3, 7], [2, 7, 6],   # +y
+    [0, 2, 6], [0, 6, 4],   # -z
+    [1, 5, 7], [1, 7, 3],   # +z
+], dtype=np.uint32)
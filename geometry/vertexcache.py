@@ -0,0 +1,129 @@
+import numpy as np
+
+# Triangle and vertex order for the GPU's post-transform vertex cache, after Sander,
+# Nehab and Barczak, "Fast Triangle Reordering for Vertex Locality and Reduced
+# Overdraw" (Tipsify). Triangles are emitted by fanning around vertices that are
+# likely still in the cache, then the disconnected clusters this produces are sorted
+# so outward facing geometry is drawn first.
+
+CACHE_SIZE = 16
+
+def acmr(triangles, cache_size=CACHE_SIZE) -> float:
+    '''Average cache miss ratio: vertices transformed per triangle with a FIFO cache'''
+    flat = np.asarray(triangles).ravel().tolist()
+    if not flat:
+        return 0.0
+    stamps = {}
+    misses = 0
+    for v in flat:
+        if misses - stamps.get(v, -cache_size) >= cache_size:
+            misses += 1
+            stamps[v] = misses
+    return misses / (len(flat) // 3)
+
+def adjacency(triangles, vertex_count):
+    '''Triangles around each vertex, as flat lists and offsets'''
+    flat = triangles.ravel()
+    order = np.argsort(flat, kind='stable') // 3
+    counts = np.bincount(flat, minlength=vertex_count)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    return order.tolist(), offsets.tolist(), counts.tolist()
+
+def tipsify(triangles, vertex_count, cache_size=CACHE_SIZE):
+    '''
+    Reorder triangles for the vertex cache.
+    Returns the reordered triangles and the start of each cluster, where the
+    order jumps to a part of the mesh that isn't connected to the last one.
+    '''
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    count = len(triangles)
+    if count == 0:
+        return triangles, np.zeros(0, dtype=np.int64)
+
+    around, offsets, live = adjacency(triangles, vertex_count)
+    corners = triangles.tolist()
+    stamps = [-cache_size - 1] * vertex_count
+    emitted = bytearray(count)
+    order, clusters, dead_ends = [], [0], []
+    time = 0
+    cursor = 0      # Next vertex to try when every dead end is exhausted
+    fan = corners[0][0]
+
+    while fan >= 0:
+        candidates = []
+        for t in around[offsets[fan]:offsets[fan + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = 1
+            order.append(t)
+            for v in corners[t]:
+                dead_ends.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if time - stamps[v] > cache_size:
+                    stamps[v] = time
+                    time += 1
+
+        # Fan around the candidate that will still be cached after its remaining
+        # triangles are emitted, preferring the one that entered the cache first
+        fan, best = -1, -1
+        for v in candidates:
+            if live[v] > 0:
+                age = time - stamps[v]
+                priority = age if age + 2 * live[v] <= cache_size else 0
+                if priority > best:
+                    fan, best = v, priority
+        if fan >= 0:
+            continue
+
+        while dead_ends:
+            v = dead_ends.pop()
+            if live[v] > 0:
+                fan = v
+                break
+        else:
+            while cursor < vertex_count and live[cursor] == 0:
+                cursor += 1
+            if cursor < vertex_count:
+                fan = cursor
+                clusters.append(len(order))
+
+    return triangles[order], np.asarray(clusters, dtype=np.int64)
+
+def sort_clusters(triangles, clusters, positions):
+    '''
+    Draw clusters facing away from the center of the mesh first, they are the
+    most likely to occlude the rest. Order within clusters is kept.
+    '''
+    triangles = np.asarray(triangles).reshape(-1, 3)
+    if len(clusters) < 2:
+        return triangles
+    positions = np.asarray(positions, dtype=np.float64)
+    a, b, c = (positions[triangles[:, i]] for i in range(3))
+    normals = np.cross(b - a, c - a)                # Area weighted
+    centers = (a + b + c) / 3
+    areas = np.linalg.norm(normals, axis=1)
+
+    cluster_of = np.repeat(np.arange(len(clusters)), np.diff(np.append(clusters, len(triangles))))
+    total = np.bincount(cluster_of, weights=areas, minlength=len(clusters))
+    normal = np.stack([np.bincount(cluster_of, weights=normals[:, i], minlength=len(clusters)) for i in range(3)], axis=1)
+    center = np.stack([np.bincount(cluster_of, weights=areas * centers[:, i], minlength=len(clusters)) for i in range(3)], axis=1)
+    center /= np.maximum(total, 1e-30)[:, None]
+    mesh_center = (areas[:, None] * centers).sum(axis=0) / max(areas.sum(), 1e-30)
+
+    facing = np.einsum('ij,ij->i', center - mesh_center, normal)
+    rank = np.empty(len(clusters), dtype=np.int64)
+    rank[np.argsort(-facing, kind='stable')] = np.arange(len(clusters))
+    return triangles[np.argsort(rank[cluster_of], kind='stable')]
+
+def optimize_fetch(triangles, vertex_count):
+    '''
+    Renumber vertices in the order triangles first use them, dropping unused ones.
+    Returns (old vertex ids in the new order, triangles using the new ids).
+    '''
+    triangles = np.asarray(triangles).reshape(-1, 3)
+    ids, first = np.unique(triangles.ravel(), return_index=True)
+    used = ids[np.argsort(first)]
+    remap = np.full(vertex_count, -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    return used, remap[triangles]
@@ -1,9 +1,11 @@
 import bpy
-from bpy.props import BoolProperty, EnumProperty
+from bpy.props import BoolProperty, EnumProperty, IntProperty
 from ..data.scene import CollectionData
-import io_scene_gltf2 as gltf2
+from io_scene_gltf2 import ExportGLTF2_Base
 from ..util import override_props
 from ..data.prefs import SourcePreferences
+from ..util.profiling import get_peak_rss, format_bytes
+from ..export.proxies import proxy_cache
 from bpy_extras.io_utils import ExportHelper
 
 class IO_FH_src_gltf(bpy.types.FileHandler):
@@ -14,7 +16,7 @@ class IO_FH_src_gltf(bpy.types.FileHandler):
     bl_file_extensions = ".glb;.gltf"
 
 @override_props
-class ExportGLTF2_Sourcery(bpy.types.Operator, gltf2.ExportGLTF2_Base, ExportHelper):
+class ExportGLTF2_Sourcery(bpy.types.Operator, ExportGLTF2_Base, ExportHelper):
     """Export scene as a specialized glTF 2.0 file"""
     bl_idname = 'export_scene.src_gltf'
     bl_label = 'Export glTF (Sourcery)'
@@ -37,6 +39,66 @@ class ExportGLTF2_Sourcery(bpy.types.Operator, gltf2.ExportGLTF2_Base, ExportHel
     # We only use 'export_all_vertex_colors' to control if vertex colors are included
     export_active_vertex_color_when_no_material: BoolProperty(default=False)
 
+    fast_export: BoolProperty(
+        name='Fast Export',
+        description='Write static props with a vectorized GLB writer instead of the glTF add-on. Exports it can\'t handle still use the glTF add-on',
+        default=False
+    )
+
+    streaming_export: BoolProperty(
+        name='Streaming Export',
+        description='Evaluate, write and free one object at a time to keep memory use low on huge collections. Uses the fast export path',
+        default=False
+    )
+
+    memory_limit: IntProperty(
+        name='Memory Limit',
+        description='Cancel a streaming export if Blender uses more memory than this (MiB). 0 for no limit',
+        default=0, min=0, subtype='UNSIGNED'
+    )
+
+    def execute(self, context):
+        # Exports run by an outer scope, like a batch, share custom collision with it
+        with proxy_cache.scope():
+            return self.export(context)
+
+    def export(self, context):
+        if self.fast_export or self.streaming_export:
+            from ..export import fastpath
+            reason = fastpath.can_fast_export(self)
+            if reason is None:
+                return self.execute_fast()
+            print(f"[Sourcery] Using the glTF add-on for '{self.collection}': {reason}")
+        result = super().execute(context)
+        print(f"[Sourcery] Exported '{self.collection}', process peak RSS {format_bytes(get_peak_rss())}")
+        self.report_issues()
+        return result
+
+    def execute_fast(self):
+        from ..export import fastpath
+        filepath = bpy.path.ensure_ext(bpy.path.abspath(self.filepath), '.glb')
+        try:
+            timings = fastpath.fast_export(
+                self, filepath,
+                stream=self.streaming_export,
+                memory_limit=self.memory_limit * 1024 * 1024 if self.streaming_export else 0
+            )
+        except fastpath.MemoryLimitError as e:
+            self.report_issues()
+            self.report({'ERROR'}, f"Export of '{self.collection}' cancelled: {e}")
+            return {'CANCELLED'}
+        mode = 'Streaming' if self.streaming_export else 'Fast'
+        print(f"[Sourcery] {mode} export of '{self.collection}' took {timings['total'] * 1000:.1f}ms, "
+              f"peak RSS {format_bytes(timings['peak_rss'])}")
+        self.report_issues()
+        return {'FINISHED'}
+
+    def report_issues(self):
+        '''Show the issues the export found in the status bar and Info editor, not just the console'''
+        from ..export.session import export_issues
+        for issue in export_issues.pop(self.collection, []):
+            self.report({'WARNING'}, f"'{self.collection}': {issue}")
+
     def draw(self, context):
         draw_export_properties(self, context, self)
 
@@ -57,9 +119,16 @@ def draw_export_properties(self, context, operator, compact=False):
         if body:
             CollectionData.draw(data, body, context)
 
+    layout.prop(operator, 'fast_export')
+    layout.prop(operator, 'streaming_export')
+    if operator.streaming_export:
+        layout.prop(operator, 'memory_limit')
+
     header, body = layout.panel("SRC_gltf_options", default_closed=True)
     header.label(text="glTF Options")
     if body:
+        # Only pull in the glTF UI when the options are shown
+        import io_scene_gltf2 as gltf2
         export_main(body, operator, is_file_browser)
         #gltf2.export_panel_collection(body, operator, is_file_browser)   # only contains 'at_collection_center', moved to Scene Graph
         body.use_property_split = not compact
@@ -97,6 +166,7 @@ def export_main(layout, operator, is_file_browser):
 def export_panel_include(layout, operator, is_file_browser):
     if not is_file_browser: # Only for file browser mode for now
         return
+    import io_scene_gltf2 as gltf2
     return gltf2.export_panel_include(layout, operator, is_file_browser)
 
 def export_panel_data(layout, operator):
@@ -104,6 +174,7 @@ def export_panel_data(layout, operator):
     #header.label(text="Data")
     body = layout
     if body:
+        import io_scene_gltf2 as gltf2
         export_panel_data_scene_graph(body, operator)
         export_panel_data_mesh(body, operator)
         #gltf2.export_panel_data_material(body, operator)   # not exposed to user
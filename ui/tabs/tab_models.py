@@ -1,39 +1,55 @@
 import bpy
+from fnmatch import fnmatchcase
+from bpy.props import BoolProperty
 from bpy.types import Panel, UIList, Operator, Collection, UILayout
 from ...data.scene import SceneData
+from ...export.exporters import get_src_exporter, get_src_exporter_index, iter_src_models, export_model, model_registry
+from ...export.fingerprint import FingerprintCache, fingerprint_collection
+from ...export.proxies import proxy_cache
 from ...data.prefs import SourcePreferences
 from ..exporter import draw_export_properties
 from .. import lists
 
-def get_src_exporter(collection: Collection):
-    for exp in collection.exporters:
-        if exp.export_properties.__class__.__name__ == 'EXPORT_SCENE_OT_src_gltf':
-            return exp
-    return None
-
-def get_src_exporter_index(collection: Collection):
-    for i, exp in enumerate(collection.exporters):
-        if exp.export_properties.__class__.__name__ == 'EXPORT_SCENE_OT_src_gltf':
-            return i
-    return None
-
 class ModelList(UIList):
     bl_idname = 'SRC_UL_model_list'
+    filter_scene: BoolProperty(name='Current Scene', description='Only show models in the current scene', default=False)
+
     def draw_item(self, context, layout, data, item: Collection, icon, active_data, active_propname):
         layout.prop(item, 'name', text='', icon='OUTLINER_COLLECTION', emboss=False, translate=False)
 
     def filter_items(self, context, data, property):
         items = getattr(data, property)
-        flags = [] #bpy.types.UI_UL_list.filter_items_by_name("base", self.bitflag_filter_item, items, "name")
-        for item in items:
-            # TODO: Filter by current scene somehow
-            flag = 0
-            exp = get_src_exporter(item)
-            if exp:
-                flag = self.bitflag_filter_item
-            flags.append(flag)
+        flag_hide = self.bitflag_filter_item if self.use_filter_invert else 0
+        flag_show = self.bitflag_filter_item if not self.use_filter_invert else 0
+        pattern = f'*{self.filter_name.lower()}*' if self.filter_name else None
+        scene_collections = model_registry.scene_collections(context.scene) if self.filter_scene else None
+
+        # Only collections with an exporter are shown, so start with everything hidden
+        flags = [flag_hide] * len(items)
+        for name, i, idx in model_registry.items():
+            if scene_collections is not None and name not in scene_collections:
+                continue
+            if pattern is None:
+                flags[i] = flag_show
+            else:
+                flags[i] = self.bitflag_filter_item if fnmatchcase(name.lower(), pattern) else 0
         return (flags, [])
 
+    def draw_filter(self, context, main_layout: UILayout):
+        layout = main_layout.row()
+
+        # Standard filters
+        row = layout.column().row(align=True)
+        row.prop(self, 'filter_name', text='')
+        row.prop(self, 'use_filter_invert', icon='ARROW_LEFTRIGHT', icon_only=True)
+        row = layout.column().row(align=True)
+        row.prop(self, 'use_filter_sort_alpha', icon='SORTALPHA', icon_only=True)
+        row.prop(self, 'use_filter_sort_reverse', icon=('SORT_DESC' if self.use_filter_sort_reverse else 'SORT_ASC'), icon_only=True)
+
+        # Filter by scene
+        row = layout.column().row(align=True)
+        row.prop(self, 'filter_scene', icon_only=True, icon='SCENE_DATA')
+
 class AddModel(Operator):
     bl_idname = 'src.add_model'
     bl_description = 'Add a model exporter for the active collection'
@@ -47,6 +63,7 @@ class AddModel(Operator):
 
     def execute(self, context):
         bpy.ops.collection.exporter_add(name='IO_FH_src_gltf')
+        model_registry.update(context.collection)
         SceneData.get(context).models_active = bpy.data.collections.find(context.collection.name)
         return {'FINISHED'}
     
@@ -67,8 +84,40 @@ class RemoveModel(Operator):
                 idx = get_src_exporter_index(collection)
                 if idx is not None:
                     bpy.ops.collection.exporter_remove(index=idx)
-                    while scene_data.models_active >= 0 and get_src_exporter(bpy.data.collections[scene_data.models_active]) is None:
-                        scene_data.models_active -= 1
+                    model_registry.update(collection)
+                    scene_data.models_active = model_registry.last_model(scene_data.models_active)
+        return {'FINISHED'}
+
+class ExportChanged(Operator):
+    bl_idname = 'src.export_changed'
+    bl_description = 'Export all models that changed since they were last exported'
+    bl_label = 'Export Changed'
+    bl_options = {'REGISTER'}
+    force: BoolProperty(name='Force', description='Export all models, even if unchanged', default=False)
+
+    def execute(self, context):
+        cache = FingerprintCache.for_blend()
+        depsgraph = context.evaluated_depsgraph_get()
+        exported, skipped, failed = 0, 0, 0
+
+        with proxy_cache.scope():
+            for collection, idx in iter_src_models():
+                exp = collection.exporters[idx]
+                filepath = bpy.path.abspath(exp.export_properties.filepath)
+                fingerprint = fingerprint_collection(collection, exp, depsgraph)
+
+                if not self.force and cache.is_current(collection, filepath, fingerprint):
+                    skipped += 1
+                    continue
+
+                if export_model(collection, idx):
+                    cache.update(collection, filepath, fingerprint)
+                    exported += 1
+                else:
+                    failed += 1
+
+        cache.save()
+        self.report({'WARNING'} if failed else {'INFO'}, f'Exported {exported} models ({skipped} unchanged, {failed} failed)')
         return {'FINISHED'}
 
 ###############################################################################
@@ -104,4 +153,5 @@ def draw_tab_models(panel, layout: UILayout, context):
     if collection:
         with context.temp_override(collection=collection):
             row.operator('collection.export_all', icon='EXPORT', text='Export')
+    row.operator(ExportChanged.bl_idname, icon='FILE_REFRESH', text='Export Changed')
     row.operator('wm.collection_export_all', icon='EXPORT', text='Export All')
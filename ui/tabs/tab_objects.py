@@ -1,7 +1,10 @@
 import bpy
+import bmesh
+from fnmatch import fnmatchcase
 from bpy.props import BoolProperty
 from bpy.types import Object, UIList, UILayout, Operator, Context
-from ...data.scene import SceneData, ObjectData, CollisionModeProperty
+from ...data.scene import SceneData, ObjectData, CollisionModeProperty, FACE_COLLISION_ATTRIBUTE
+from ...data.tag_index import tag_index
 from .. import lists
 
 ###############################################################################
@@ -40,28 +43,28 @@ class ObjectList(UIList):
         flag_show = self.bitflag_filter_item if not self.use_filter_invert else 0
         filter_modes = self.filter_mesh or self.filter_hull or self.filter_box or self.filter_none
 
-        # Filter by name
-        if self.filter_name:
-            flags = bpy.types.UI_UL_list.filter_items_by_name(self.filter_name, self.bitflag_filter_item, items, 'name')
-        else:
-            flags = [flag_show] * len(items)
-        
-        # Filter by presence of data and collision mode
-        for i, item in enumerate(items):
-            if not obj_has_data(item):
-                flags[i] = flag_hide
-            elif filter_modes:
-                if not self.filter_invisible and not item.sourcery_data.visible:
-                    flags[i] = flag_hide
-                elif not self.filter_mesh and item.sourcery_data.collision_mode == 'MESH':
-                    flags[i] = flag_hide
-                elif not self.filter_hull and item.sourcery_data.collision_mode == 'HULL':
-                    flags[i] = flag_hide
-                elif not self.filter_box and item.sourcery_data.collision_mode == 'BOX':
-                    flags[i] = flag_hide
-                elif not self.filter_none and item.sourcery_data.collision_mode == 'NONE':
-                    flags[i] = flag_hide
-                
+        # Only tagged objects are shown, so start with everything hidden
+        flags = [flag_hide] * len(items)
+        pattern = f'*{self.filter_name.lower()}*' if self.filter_name else None
+        hidden = {
+            'MESH': not self.filter_mesh,
+            'HULL': not self.filter_hull,
+            'BOX': not self.filter_box,
+            'NONE': not self.filter_none,
+        }
+
+        # Filter by collision mode and name
+        for name, i, (collision_mode, visible) in tag_index.items():
+            if filter_modes:
+                if not self.filter_invisible and not visible:
+                    continue
+                elif hidden.get(collision_mode, False):
+                    continue
+            if pattern is None:
+                flags[i] = flag_show
+            else:
+                flags[i] = self.bitflag_filter_item if fnmatchcase(name.lower(), pattern) else 0
+
         return (flags, [])
     
     def draw_filter(self, context, main_layout: UILayout):
@@ -104,8 +107,8 @@ class RemoveObject(ObjectListOp, Operator):
         object = bpy.data.objects[scene_data.objects_active]
         if object:
             object.sourcery_data.reset()
-        while scene_data.objects_active >= 0 and not obj_has_data(bpy.data.objects[scene_data.objects_active]):
-            scene_data.objects_active -= 1
+            tag_index.update(object)
+        scene_data.objects_active = tag_index.last_tagged(scene_data.objects_active)
 
         return {'FINISHED'}    
 
@@ -165,6 +168,7 @@ class AddTags(Operator):
                     obj.sourcery_data.collision_mode = self.collision_mode
                 if (self.visible != True):
                     obj.sourcery_data.visible = self.visible
+                tag_index.update(obj)
                 last = obj
         if last is not None:
             SceneData.get(context).objects_active = bpy.data.objects.find(last.name)
@@ -200,12 +204,39 @@ class RemoveTags(Operator):
         scene_data = SceneData.get(context)
         for obj in context.selected_objects:
             obj.sourcery_data.reset()
-            while scene_data.objects_active >= 0 and not obj_has_data(bpy.data.objects[scene_data.objects_active]):
-                scene_data.objects_active -= 1
+            tag_index.update(obj)
+        scene_data.objects_active = tag_index.last_tagged(scene_data.objects_active)
 
         return {'FINISHED'}
 
 
+# Face Operators
+###############################################################################
+
+class SetFaceCollision(Operator):
+    bl_idname = 'src.set_face_collision'
+    bl_description = 'Set the collision mode of the selected faces. Auto uses the object\'s mode'
+    bl_label = 'Set Face Collision'
+    bl_options = {'INTERNAL', 'REGISTER', 'UNDO'}
+    collision_mode: CollisionModeProperty
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'EDIT_MESH'
+
+    def execute(self, context):
+        number = next(n for id, _, _, _, n in CollisionModeProperty.keywords['items'] if id == self.collision_mode)
+        for obj in context.objects_in_mode:
+            if obj.type != 'MESH':
+                continue
+            bm = bmesh.from_edit_mesh(obj.data)
+            layer = bm.faces.layers.int.get(FACE_COLLISION_ATTRIBUTE) or bm.faces.layers.int.new(FACE_COLLISION_ATTRIBUTE)
+            for face in bm.faces:
+                if face.select:
+                    face[layer] = number
+            bmesh.update_edit_mesh(obj.data, loop_triangles=False, destructive=False)
+        return {'FINISHED'}
+
 # Object List Menu
 ###############################################################################
 
@@ -216,9 +247,8 @@ class SelectAllObjects(Operator):
     bl_options = {'INTERNAL', 'REGISTER', 'UNDO'}
 
     def execute(self, context):
-        for object in bpy.data.objects:
-            if obj_has_data(object):
-                object.select_set(True)
+        for object in tag_index.objects():
+            object.select_set(True)
         return {'FINISHED'}
     
 
@@ -230,9 +260,8 @@ class SelectObjectsByTag(Operator):
     collision_mode: CollisionModeProperty
 
     def execute(self, context):
-        for object in bpy.data.objects:
-            if obj_has_data(object) and object.sourcery_data.collision_mode == self.collision_mode:
-                object.select_set(True)
+        for object in tag_index.objects(collision_mode=self.collision_mode):
+            object.select_set(True)
         return {'FINISHED'}
 
 class ObjectMenu(bpy.types.Menu):
@@ -262,6 +291,12 @@ def draw_tab_objects(panel, layout: UILayout, context: Context):
     layout.operator(AddTags.bl_idname, icon='RESTRICT_RENDER_ON', text='Invisible').visible = False
     layout.operator(RemoveTags.bl_idname, icon='TRASH', text='Clear Tags')
 
+    if context.mode == 'EDIT_MESH':
+        layout.label(text='Face Collision', icon='FACESEL')
+        flow = layout.grid_flow(row_major=True, columns=0 if context.region.width < 200 else 2, even_columns=True, even_rows=False, align=False)
+        for id, name, desc, icon, number in CollisionModeProperty.keywords['items']:
+            flow.operator(SetFaceCollision.bl_idname, icon=icon, text=name).collision_mode = id
+
     #layout.separator(factor=2, type='LINE')
 
 def draw_panel_object_list(panel, layout: UILayout, context):
@@ -316,7 +351,9 @@ def draw_panel_object_list(panel, layout: UILayout, context):
             row.prop_enum(data, 'collision_mode', 'BOX')
             row.prop_enum(data, 'collision_mode', 'NONE')
 
-    layout.operator('wm.collection_export_all', icon='EXPORT', text='Export All')
+    row = layout.row()
+    row.operator('src.export_changed', icon='FILE_REFRESH', text='Export Changed')
+    row.operator('wm.collection_export_all', icon='EXPORT', text='Export All')
     
 
 
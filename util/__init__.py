@@ -1 +1,3 @@
-from .override_props import override_props
\ No newline at end of file
+from .override_props import override_props
+from .profiling import get_rss, get_peak_rss, format_bytes
+from .cache import ArrayCache, cache_dir
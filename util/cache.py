@@ -0,0 +1,53 @@
+import os
+import bpy
+import tempfile
+import numpy as np
+from pathlib import Path
+
+package_name = __package__.rpartition('.')[0]
+
+def cache_dir(name) -> Path:
+    '''Persistent per-user cache folder for the add-on'''
+    try:
+        path = Path(bpy.utils.extension_path_user(package_name, path=os.path.join('cache', name), create=True))
+    except (ValueError, AttributeError):
+        path = Path(tempfile.gettempdir()) / 'sourcery' / name    # Legacy add-on
+        path.mkdir(parents=True, exist_ok=True)
+    return path
+
+class ArrayCache:
+    '''
+    Stores sets of NumPy arrays on disk, keyed by a content hash.
+    Used to avoid recomputing derived geometry for unchanged meshes.
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.path = None
+        self.hits = 0
+        self.misses = 0
+
+    def file(self, key) -> Path:
+        if self.path is None:
+            self.path = cache_dir(self.name)
+        return self.path / f'{key}.npz'
+
+    def get(self, key) -> dict | None:
+        try:
+            with np.load(self.file(key), allow_pickle=False) as data:
+                arrays = {k: data[k] for k in data.files}
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return arrays
+
+    def put(self, key, **arrays):
+        path = self.file(key)
+        tmp = path.with_name(path.name + f'.{os.getpid()}.tmp')
+        try:
+            with open(tmp, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)   # Atomic, so parallel exports never read a partial file
+        except OSError as e:
+            print(f"[Sourcery] Warning: Failed to write cache file '{path}': {e}")
@@ -0,0 +1,72 @@
+import os
+import sys
+
+def get_rss():
+    '''Current resident memory of this process in bytes, or None if unknown'''
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/self/statm', 'r') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == 'win32':
+        return get_win32_memory_info('WorkingSetSize')
+    return None
+
+def get_peak_rss():
+    '''Peak resident memory of this process in bytes, or None if unknown'''
+    if sys.platform == 'win32':
+        return get_win32_memory_info('PeakWorkingSetSize')
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024   # kilobytes on Linux
+
+def get_win32_memory_info(field):
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+    except (AttributeError, OSError):
+        return None
+    return getattr(counters, field)
+
+class MemoryLimitError(RuntimeError):
+    pass
+
+def check_memory(memory_limit, after):
+    '''Stop an export if the process is using more than memory_limit bytes'''
+    if not memory_limit:
+        return
+    rss = get_rss()
+    if rss is not None and rss > memory_limit:
+        raise MemoryLimitError(
+            f"Memory use reached {format_bytes(rss)} after {after}, "
+            f"over the limit of {format_bytes(memory_limit)}"
+        )
+
+def format_bytes(size):
+    if size is None:
+        return '?'
+    return f'{size / (1024 * 1024):.1f} MiB'
@@ -0,0 +1,89 @@
+import os
+import sys
+import importlib
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Worker processes run Blender's bundled Python without bpy, so the add-on package
+# itself can't be imported there. Subpackages that only depend on NumPy (like geometry)
+# are loaded by path under a standalone name instead, in both this process and the workers.
+
+addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STANDALONE_PREFIX = '_sourcery_'
+
+# Runs in each worker via exec, which is picklable where our own functions are not
+BOOTSTRAP = '''
+import sys, os, importlib.util
+if name not in sys.modules:
+    spec = importlib.util.spec_from_file_location(name, os.path.join(path, '__init__.py'), submodule_search_locations=[path])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+'''
+
+def standalone(package: str):
+    '''Name and path of an add-on subpackage loaded on its own'''
+    name = STANDALONE_PREFIX + package
+    path = os.path.join(addon_dir, package)
+    if name not in sys.modules:
+        exec(BOOTSTRAP, {'name': name, 'path': path})
+    return name, path
+
+shared_pools = {}   # standalone package name -> pool, while inside worker_pool()
+shared_depth = 0
+
+@contextmanager
+def worker_pool():
+    '''Share one pool per package between the parallel_map calls inside, like the stages of an export'''
+    global shared_depth
+    shared_depth += 1
+    try:
+        yield
+    finally:
+        shared_depth -= 1
+        if shared_depth == 0:
+            for pool in shared_pools.values():
+                pool.shutdown()
+            shared_pools.clear()
+
+def make_pool(name, path, max_workers) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=exec,
+        initargs=(BOOTSTRAP, {'name': name, 'path': path})
+    )
+
+def parallel_map(function: str, jobs: list[tuple], max_workers=None) -> list:
+    '''
+    Call function (e.g. 'geometry.decompose.convex_decomposition') with each tuple
+    of arguments in a pool of worker processes. Runs in this process if there is
+    only one job or worker processes can't be started. Inside worker_pool() the
+    pool is kept for the next call instead of being started again.
+    '''
+    package, _, rest = function.partition('.')
+    module, _, attr = rest.rpartition('.')
+    name, path = standalone(package)
+    func = getattr(importlib.import_module(f'{name}.{module}'), attr)
+
+    cpus = max_workers or os.cpu_count() or 1
+    if min(cpus, len(jobs)) <= 1:
+        return [func(*job) for job in jobs]
+
+    try:
+        if shared_depth:
+            pool = shared_pools.get(name)
+            if pool is None:
+                pool = shared_pools[name] = make_pool(name, path, cpus)
+            return list(pool.map(func, *zip(*jobs)))
+        with make_pool(name, path, min(cpus, len(jobs))) as pool:
+            return list(pool.map(func, *zip(*jobs)))
+    except (OSError, BrokenProcessPool) as e:
+        broken = shared_pools.pop(name, None)
+        if broken is not None:
+            broken.shutdown(wait=False)
+        print(f"[Sourcery] Warning: Worker processes unavailable ({e}), running in process")
+        return [func(*job) for job in jobs]